@@ -29,8 +29,6 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from jose import JWTError
 from pydantic import BaseSettings
-from redis.asyncio import Redis
-from starlette.middleware.base import BaseHTTPMiddleware
 
 try:
     if sys.version_info >= (3, 13):
@@ -63,7 +61,7 @@ except Exception:
 
 from models.response_model import ResponseModel
 from routes.analytics_routes import analytics_router
-from middleware.analytics_middleware import setup_analytics_middleware
+from middleware.analytics_middleware import AnalyticsMiddleware
 from utils.analytics_scheduler import analytics_scheduler
 from routes.api_routes import api_router
 from routes.authorization_routes import authorization_router
@@ -98,6 +96,13 @@ from utils.audit_util import audit
 from middleware.security_audit_middleware import SecurityAuditMiddleware
 from middleware.logging_middleware import GlobalLoggingMiddleware
 from middleware.latency_injection_middleware import LatencyInjectionMiddleware
+from middleware.gateway_pipeline import (
+    GatewayPipeline,
+    MiddlewareStage,
+    get_request,
+    on_response_start,
+    pipeline_stage,
+)
 from middleware.websocket_reject_middleware import WebSocketRejectMiddleware
 from utils.auth_blacklist import purge_expired_tokens
 from utils.cache_manager_util import cache_manager
@@ -106,14 +111,25 @@ from utils.hot_reload_config import hot_config
 from utils.ip_policy_util import _get_client_ip as _policy_get_client_ip
 from utils.ip_policy_util import _ip_in_list as _policy_ip_in_list
 from utils.ip_policy_util import _is_loopback as _policy_is_loopback
+from utils.log_pipeline_util import (
+    BatchRotatingFileHandler,
+    BatchStreamHandler,
+    RedactFilter,
+    log_pipeline,
+)
 from utils.memory_dump_util import (
     dump_memory_to_file,
     find_latest_dump_path,
     restore_memory_from_file,
 )
+from utils.metrics_plane_util import metrics_plane
 from utils.metrics_util import metrics_store
+from utils.redis_client import close_async_redis_client, get_async_redis_client
 from utils.enhanced_metrics_util import enhanced_metrics_store
+from utils.request_accounting_util import request_accounting
 from utils.response_util import process_response
+from utils.proto_registry_util import proto_registry
+from utils.upstream_pool_util import warm_all_pools
 from utils.security_settings_util import (
     get_cached_settings,
     load_settings,
@@ -340,9 +356,6 @@ async def app_lifespan(app: FastAPI):
         raise
 
     mem_or_external = os.getenv('MEM_OR_EXTERNAL', 'MEM').upper()
-    redis_host = os.getenv('REDIS_HOST')
-    redis_port = os.getenv('REDIS_PORT')
-    redis_db = os.getenv('REDIS_DB')
     redis_password = os.getenv('REDIS_PASSWORD', '')
 
     if mem_or_external in ('REDIS', 'EXTERNAL'):
@@ -351,35 +364,34 @@ async def app_lifespan(app: FastAPI):
                 'Redis password not set; connection may be unauthenticated. '
                 'Set REDIS_PASSWORD environment variable to secure Redis access.'
             )
-        host = redis_host or 'localhost'
-        port = redis_port or '6379'
-        db = redis_db or '0'
-        if redis_password:
-            redis_url = f'redis://:{redis_password}@{host}:{port}/{db}'
-        else:
-            redis_url = f'redis://{host}:{port}/{db}'
-        app.state.redis = Redis.from_url(redis_url, decode_responses=True)
+        # Share the per-worker async pool with the cache, revocation and limiters
+        app.state.redis = get_async_redis_client().client
     else:
         app.state.redis = None
 
     app.state._purger_task = asyncio.create_task(automatic_purger(1800))
 
     METRICS_FILE = os.path.join(LOGS_DIR, 'metrics.json')
-    try:
-        metrics_store.load_from_file(METRICS_FILE)
-    except Exception as e:
-        gateway_logger.debug(f'Metrics restore skipped: {e}')
-
     ENHANCED_METRICS_FILE = os.path.join(LOGS_DIR, 'enhanced_metrics.json')
-    try:
-        enhanced_metrics_store.load_from_file(ENHANCED_METRICS_FILE)
-    except Exception as e:
-        gateway_logger.debug(f'Enhanced metrics restore skipped: {e}')
+    # With Redis, workers publish to the shared metrics plane, which also keeps
+    # history across restarts; restoring a per-worker file would double count
+    app.state._metrics_plane_started = metrics_plane.enabled
+    if not app.state._metrics_plane_started:
+        try:
+            metrics_store.load_from_file(METRICS_FILE)
+        except Exception as e:
+            gateway_logger.debug(f'Metrics restore skipped: {e}')
+
+        try:
+            enhanced_metrics_store.load_from_file(ENHANCED_METRICS_FILE)
+        except Exception as e:
+            gateway_logger.debug(f'Enhanced metrics restore skipped: {e}')
 
     async def _metrics_autosave(interval_s: int = 60):
         while True:
             try:
                 await asyncio.sleep(interval_s)
+                request_accounting.process_pending()
                 metrics_store.save_to_file(METRICS_FILE)
                 enhanced_metrics_store.save_to_file(ENHANCED_METRICS_FILE)
             except asyncio.CancelledError:
@@ -387,10 +399,24 @@ async def app_lifespan(app: FastAPI):
             except Exception:
                 pass
 
+    app.state._metrics_save_task = None
     try:
-        app.state._metrics_save_task = asyncio.create_task(_metrics_autosave(60))
+        if app.state._metrics_plane_started:
+            metrics_plane.start()
+        else:
+            app.state._metrics_save_task = asyncio.create_task(_metrics_autosave(60))
     except Exception:
-        app.state._metrics_save_task = None
+        pass
+
+    # Build per-upstream connection pools (and pre-open connections when
+    # UPSTREAM_POOL_WARMUP > 0) without delaying startup.
+    app.state._pool_warmup_task = asyncio.create_task(warm_all_pools())
+
+    # Compile every stored proto into the gRPC descriptor registry off the
+    # event loop; requests never run protoc themselves.
+    app.state._proto_registry_task = asyncio.create_task(
+        asyncio.to_thread(proto_registry.compile_all)
+    )
 
     try:
         await load_settings()
@@ -643,6 +669,31 @@ async def app_lifespan(app: FastAPI):
             close_database_connections()
         except Exception as e:
             gateway_logger.error(f'Error closing database connections: {e}')
+        try:
+            # Hand unused leased rate-limit/quota tokens back to the other workers
+            from utils import quota_tracker as _qt, rate_limiter as _rl
+
+            for owner in (_rl._rate_limiter, _qt._quota_tracker):
+                if owner is not None:
+                    await owner.release_leases_async()
+        except Exception as e:
+            gateway_logger.error(f'Error releasing rate limit leases: {e}')
+        try:
+            from utils.credit_ledger_util import credit_ledger
+
+            await credit_ledger.aclose()
+        except Exception as e:
+            gateway_logger.error(f'Error flushing credit ledger: {e}')
+        if getattr(app.state, '_metrics_plane_started', False):
+            try:
+                await request_accounting.aclose()
+                await metrics_plane.aclose()
+            except Exception as e:
+                gateway_logger.error(f'Error publishing final metrics: {e}')
+        try:
+            await close_async_redis_client()
+        except Exception as e:
+            gateway_logger.error(f'Error closing async Redis client: {e}')
         try:
             gateway_logger.info('Closing HTTP clients...')
             from services.gateway_service import GatewayService
@@ -654,14 +705,20 @@ async def app_lifespan(app: FastAPI):
             gateway_logger.error(f'Error closing HTTP client: {e}')
 
         try:
-            METRICS_FILE = os.path.join(LOGS_DIR, 'metrics.json')
-            metrics_store.save_to_file(METRICS_FILE)
-            ENHANCED_METRICS_FILE = os.path.join(LOGS_DIR, 'enhanced_metrics.json')
-            enhanced_metrics_store.save_to_file(ENHANCED_METRICS_FILE)
+            await request_accounting.aclose()
+            if not getattr(app.state, '_metrics_plane_started', False):
+                METRICS_FILE = os.path.join(LOGS_DIR, 'metrics.json')
+                metrics_store.save_to_file(METRICS_FILE)
+                ENHANCED_METRICS_FILE = os.path.join(LOGS_DIR, 'enhanced_metrics.json')
+                enhanced_metrics_store.save_to_file(ENHANCED_METRICS_FILE)
         except Exception:
             pass
 
         gateway_logger.info('Graceful shutdown complete')
+        try:
+            await asyncio.to_thread(log_pipeline.flush)
+        except Exception:
+            pass
         try:
             t = getattr(app.state, '_metrics_save_task', None)
             if t:
@@ -947,26 +1004,19 @@ WEBSOCKETS_ENABLED = os.getenv('WEBSOCKETS_ENABLED', 'false').lower() in ('1', '
 doorman.add_middleware(WebSocketRejectMiddleware, enabled=WEBSOCKETS_ENABLED)
 
 # Middleware to handle X-Forwarded-Proto for correct HTTPS redirects behind reverse proxy
-@doorman.middleware('http')
-async def forwarded_proto_middleware(request: Request, call_next):
+@pipeline_stage()
+async def forwarded_proto_middleware(scope, receive, send, call_next):
     """Handle X-Forwarded-Proto header to fix FastAPI redirects behind reverse proxy.
-    
+
     When behind Nginx/reverse proxy, FastAPI sees requests as HTTP even when they're HTTPS.
     This causes automatic trailing slash redirects to use http:// instead of https://.
-    This middleware updates the request scope to use the forwarded protocol.
+    This stage updates the request scope to use the forwarded protocol.
     """
-    forwarded_proto = request.headers.get('x-forwarded-proto')
+    forwarded_proto = get_request(scope).headers.get('x-forwarded-proto')
     if forwarded_proto:
-        request.scope['scheme'] = forwarded_proto
-    return await call_next(request)
+        scope['scheme'] = forwarded_proto
+    await call_next(scope, receive, send)
 
-# Enable analytics collection middleware for request/response metrics
-try:
-    setup_analytics_middleware(doorman)
-except Exception as e:
-    logging.getLogger('doorman.analytics').warning(
-        f'Failed to enable analytics middleware: {e}'
-    )
 
 # Add CORS middleware
 # Starlette CORS middleware is disabled by default because platform and per-API
@@ -1049,75 +1099,78 @@ def _platform_cors_config() -> dict:
     }
 
 
-@doorman.middleware('http')
-async def platform_cors(request: Request, call_next):
-    """Platform CORS middleware - accepts all origins (API-level CORS enforced in gateway)."""
+@pipeline_stage(prefixes=('/platform',))
+async def platform_cors(scope, receive, send, call_next):
+    """Platform CORS - accepts all origins (API-level CORS enforced in gateway).
+
+    Only /platform routes are handled here; /api/* CORS is left to the
+    per-API checks in the gateway routes. Preflights are answered directly.
+    """
+    path = str(scope.get('path') or '')
+    if not (path.startswith('/platform/') or path == '/platform'):
+        return await call_next(scope, receive, send)
     try:
-        path = str(request.url.path)
-        if path.startswith('/platform/') or path == '/platform':
-            cfg = _platform_cors_config()
-            origin = request.headers.get('origin') or request.headers.get('Origin')
-            origin_allowed = False
-            if origin:
-                if '*' in cfg['origins']:
-                    if cfg['strict'] and cfg['credentials']:
-                        try:
-                            lo = origin.lower()
-                            origin_allowed = (
-                                lo.startswith('http://localhost')
-                                or lo.startswith('https://localhost')
-                                or lo.startswith('http://127.0.0.1')
-                                or lo.startswith('https://127.0.0.1')
-                            )
-                        except Exception:
-                            origin_allowed = False
-                    else:
-                        origin_allowed = True
+        request = get_request(scope)
+        cfg = _platform_cors_config()
+        origin = request.headers.get('origin')
+        origin_allowed = False
+        if origin:
+            if '*' in cfg['origins']:
+                if cfg['strict'] and cfg['credentials']:
+                    lo = origin.lower()
+                    origin_allowed = (
+                        lo.startswith('http://localhost')
+                        or lo.startswith('https://localhost')
+                        or lo.startswith('http://127.0.0.1')
+                        or lo.startswith('https://127.0.0.1')
+                    )
                 else:
-                    origin_allowed = origin in cfg['origins']
-
-            if request.method.upper() == 'OPTIONS':
-                from fastapi.responses import Response as _Resp
-
-                headers = {}
-                # Platform CORS is permissive - echo origin unless strict mode blocks it
-                if origin_allowed and origin:
-                    headers['Access-Control-Allow-Origin'] = origin
-                    headers['Vary'] = 'Origin'
-                elif '*' in cfg['origins'] and not cfg['strict'] and origin:
-                    # Wildcard without strict mode - echo the origin for credentials support
-                    headers['Access-Control-Allow-Origin'] = origin
-                    headers['Vary'] = 'Origin'
-                elif '*' in cfg['origins'] and cfg['strict'] and cfg['credentials'] and origin:
-                    # Strict mode with credentials - explicitly block non-localhost
-                    headers['Access-Control-Allow-Origin'] = ''
-                headers['Access-Control-Allow-Methods'] = ', '.join(cfg['methods'])
-                headers['Access-Control-Allow-Headers'] = ', '.join(cfg['headers'])
-                if cfg['credentials']:
-                    headers['Access-Control-Allow-Credentials'] = 'true'
-                rid = request.headers.get('x-request-id') or request.headers.get('X-Request-ID')
-                if rid:
-                    headers['request_id'] = rid
-                return _Resp(status_code=204, headers=headers)
-
-            response = await call_next(request)
-            try:
-                if cfg['credentials']:
-                    response.headers['Access-Control-Allow-Credentials'] = 'true'
-                # Platform CORS is permissive - echo origin unless strict mode blocks it
-                if origin_allowed and origin:
-                    response.headers['Access-Control-Allow-Origin'] = origin
-                    response.headers['Vary'] = 'Origin'
-                elif '*' in cfg['origins'] and not cfg['strict'] and origin:
-                    # Wildcard without strict mode - echo the origin for credentials support
-                    response.headers['Access-Control-Allow-Origin'] = origin
-                    response.headers['Vary'] = 'Origin'
-            except Exception:
-                pass
-            return response
+                    origin_allowed = True
+            else:
+                origin_allowed = origin in cfg['origins']
     except Exception:
-        pass
-    return await call_next(request)
+        return await call_next(scope, receive, send)
+
+    if str(scope.get('method', '')).upper() == 'OPTIONS':
+        from fastapi.responses import Response as _Resp
+
+        headers = {}
+        # Platform CORS is permissive - echo origin unless strict mode blocks it
+        if origin_allowed and origin:
+            headers['Access-Control-Allow-Origin'] = origin
+            headers['Vary'] = 'Origin'
+        elif '*' in cfg['origins'] and not cfg['strict'] and origin:
+            # Wildcard without strict mode - echo the origin for credentials support
+            headers['Access-Control-Allow-Origin'] = origin
+            headers['Vary'] = 'Origin'
+        elif '*' in cfg['origins'] and cfg['strict'] and cfg['credentials'] and origin:
+            # Strict mode with credentials - explicitly block non-localhost
+            headers['Access-Control-Allow-Origin'] = ''
+        headers['Access-Control-Allow-Methods'] = ', '.join(cfg['methods'])
+        headers['Access-Control-Allow-Headers'] = ', '.join(cfg['headers'])
+        if cfg['credentials']:
+            headers['Access-Control-Allow-Credentials'] = 'true'
+        rid = request.headers.get('x-request-id')
+        if rid:
+            headers['request_id'] = rid
+        return await _Resp(status_code=204, headers=headers)(scope, receive, send)
+
+    def _apply(message, headers):
+        try:
+            if cfg['credentials']:
+                headers['Access-Control-Allow-Credentials'] = 'true'
+            # Platform CORS is permissive - echo origin unless strict mode blocks it
+            if origin_allowed and origin:
+                headers['Access-Control-Allow-Origin'] = origin
+                headers['Vary'] = 'Origin'
+            elif '*' in cfg['origins'] and not cfg['strict'] and origin:
+                # Wildcard without strict mode - echo the origin for credentials support
+                headers['Access-Control-Allow-Origin'] = origin
+                headers['Vary'] = 'Origin'
+        except Exception:
+            pass
+
+    await call_next(scope, receive, on_response_start(send, _apply))
 
 
 MAX_BODY_SIZE = int(os.getenv('MAX_BODY_SIZE_BYTES', 1_048_576))
@@ -1164,8 +1217,19 @@ class LimitedStreamReader:
         return message
 
 
-@doorman.middleware('http')
-async def body_size_limit(request: Request, call_next):
+def _body_too_large(limit: int):
+    return process_response(
+        ResponseModel(
+            status_code=413,
+            error_code='REQ001',
+            error_message=f'Request entity too large (max: {limit} bytes)',
+        ).dict(),
+        'rest',
+    )
+
+
+@pipeline_stage()
+async def body_size_limit(scope, receive, send, call_next):
     """Enforce request body size limits to prevent DoS attacks.
 
     Protects against both:
@@ -1182,322 +1246,142 @@ async def body_size_limit(request: Request, call_next):
     - /api/graphql/*: Enforce on GraphQL queries
     - /api/grpc/*: Enforce on gRPC JSON payloads
     """
+    if os.getenv('DISABLE_BODY_SIZE_LIMIT', 'false').lower() in ('1', 'true', 'yes', 'on'):
+        return await call_next(scope, receive, send)
+    path = str(scope.get('path') or '')
+
     try:
-        if os.getenv('DISABLE_BODY_SIZE_LIMIT', 'false').lower() in ('1', 'true', 'yes', 'on'):
-            return await call_next(request)
-        path = str(request.url.path)
+        raw_excludes = os.getenv('BODY_LIMIT_EXCLUDE_PATHS', '')
+        if raw_excludes:
+            excludes = [p.strip() for p in raw_excludes.split(',') if p.strip()]
+            if any(path == p or (p.endswith('*') and path.startswith(p[:-1])) for p in excludes):
+                return await call_next(scope, receive, send)
+    except Exception:
+        pass
 
+    if path.startswith('/platform/monitor/') or path == '/platform/security/settings':
+        return await call_next(scope, receive, send)
+
+    should_enforce = False
+    default_limit = _get_max_body_size()
+    limit = default_limit
+
+    if path.startswith('/platform/authorization'):
+        should_enforce = True
+    elif path.startswith('/api/soap/'):
+        should_enforce = True
+        limit = int(os.getenv('MAX_BODY_SIZE_BYTES_SOAP', default_limit))
+    elif path.startswith('/api/graphql/'):
+        should_enforce = True
+        limit = int(os.getenv('MAX_BODY_SIZE_BYTES_GRAPHQL', default_limit))
+    elif path.startswith('/api/grpc/'):
+        should_enforce = True
+        limit = int(os.getenv('MAX_BODY_SIZE_BYTES_GRPC', default_limit))
+    elif path.startswith('/api/rest/'):
+        should_enforce = True
+        limit = int(os.getenv('MAX_BODY_SIZE_BYTES_REST', default_limit))
+    elif path.startswith('/api/'):
+        should_enforce = True
+    elif path.startswith('/platform/'):
+        should_enforce = True
+
+    if not should_enforce:
+        return await call_next(scope, receive, send)
+
+    request = get_request(scope)
+    cl = request.headers.get('content-length')
+    transfer_encoding = request.headers.get('transfer-encoding', '').lower()
+
+    if cl and str(cl).strip() != '':
         try:
-            raw_excludes = os.getenv('BODY_LIMIT_EXCLUDE_PATHS', '')
-            if raw_excludes:
-                excludes = [p.strip() for p in raw_excludes.split(',') if p.strip()]
-                if any(
-                    path == p or (p.endswith('*') and path.startswith(p[:-1])) for p in excludes
-                ):
-                    return await call_next(request)
-        except Exception:
-            pass
-
-        if path.startswith('/platform/monitor/'):
-            return await call_next(request)
-
-        if path == '/platform/security/settings':
-            try:
-                return await call_next(request)
-            except Exception as e:
-                msg = str(e)
-                if 'EndOfStream' in msg or 'No response returned' in msg:
-                    try:
-                        from models.response_model import ResponseModel as _RM
-                        from utils.response_util import process_response as _pr
-
-                        return _pr(
-                            _RM(
-                                status_code=200, message='Settings updated (middleware bypass)'
-                            ).dict(),
-                            'rest',
-                        )
-                    except Exception:
-                        pass
-                raise
-
-        should_enforce = False
-        default_limit = _get_max_body_size()
-        limit = default_limit
-
-        if path.startswith('/platform/authorization'):
-            should_enforce = True
-        elif path.startswith('/api/soap/'):
-            should_enforce = True
-            limit = int(os.getenv('MAX_BODY_SIZE_BYTES_SOAP', default_limit))
-        elif path.startswith('/api/graphql/'):
-            should_enforce = True
-            limit = int(os.getenv('MAX_BODY_SIZE_BYTES_GRAPHQL', default_limit))
-        elif path.startswith('/api/grpc/'):
-            should_enforce = True
-            limit = int(os.getenv('MAX_BODY_SIZE_BYTES_GRPC', default_limit))
-        elif path.startswith('/api/rest/'):
-            should_enforce = True
-            limit = int(os.getenv('MAX_BODY_SIZE_BYTES_REST', default_limit))
-        elif path.startswith('/api/'):
-            should_enforce = True
-        elif path.startswith('/platform/'):
-            should_enforce = True
-
-        if not should_enforce:
-            return await call_next(request)
-
-        cl = request.headers.get('content-length')
-        transfer_encoding = request.headers.get('transfer-encoding', '').lower()
-
-        if cl and str(cl).strip() != '':
+            content_length = int(cl)
+        except (ValueError, TypeError):
+            content_length = None
+        if content_length is not None and content_length > limit:
             try:
-                content_length = int(cl)
-                if content_length > limit:
-                    try:
-                        from utils.audit_util import audit
-
-                        audit(
-                            request,
-                            actor=None,
-                            action='request.body_size_exceeded',
-                            target=path,
-                            status='blocked',
-                            details={
-                                'content_length': content_length,
-                                'limit': limit,
-                                'content_type': request.headers.get('content-type'),
-                                'transfer_encoding': transfer_encoding or None,
-                            },
-                        )
-                    except Exception:
-                        pass
-
-                    return process_response(
-                        ResponseModel(
-                            status_code=413,
-                            error_code='REQ001',
-                            error_message=f'Request entity too large (max: {limit} bytes)',
-                        ).dict(),
-                        'rest',
-                    )
-            except (ValueError, TypeError):
+                from utils.audit_util import audit
+
+                audit(
+                    request,
+                    actor=None,
+                    action='request.body_size_exceeded',
+                    target=path,
+                    status='blocked',
+                    details={
+                        'content_length': content_length,
+                        'limit': limit,
+                        'content_type': request.headers.get('content-type'),
+                        'transfer_encoding': transfer_encoding or None,
+                    },
+                )
+            except Exception:
                 pass
+            return await _body_too_large(limit)(scope, receive, send)
 
-        if 'chunked' in transfer_encoding or not cl:
-            if request.method in ('POST', 'PUT', 'PATCH'):
-                wrap_allowed = True
-                try:
-                    env_flag = os.getenv('DISABLE_PLATFORM_CHUNKED_WRAP')
-                    if isinstance(env_flag, str) and env_flag.strip() != '':
-                        if env_flag.strip().lower() in ('1', 'true', 'yes', 'on'):
-                            wrap_allowed = False
-                    if str(path) == '/platform/authorization':
-                        wrap_allowed = True
-                except Exception:
-                    pass
-
-                if wrap_allowed:
-                    original_receive = request.receive
-                    limited_reader = LimitedStreamReader(original_receive, limit)
-                    request._receive = limited_reader
-
-                try:
-                    response = await call_next(request)
-
-                    try:
-                        if wrap_allowed and (
-                            limited_reader.over_limit or limited_reader.bytes_received > limit
-                        ):
-                            try:
-                                from utils.audit_util import audit
-
-                                audit(
-                                    request,
-                                    actor=None,
-                                    action='request.body_size_exceeded',
-                                    target=path,
-                                    status='blocked',
-                                    details={
-                                        'bytes_received': limited_reader.bytes_received,
-                                        'limit': limit,
-                                        'content_type': request.headers.get('content-type'),
-                                        'transfer_encoding': transfer_encoding or 'chunked',
-                                    },
-                                )
-                            except Exception:
-                                pass
-
-                            return process_response(
-                                ResponseModel(
-                                    status_code=413,
-                                    error_code='REQ001',
-                                    error_message=f'Request entity too large (max: {limit} bytes)',
-                                ).dict(),
-                                'rest',
-                            )
-                    except Exception:
-                        pass
-
-                    return response
-                except Exception:
-                    try:
-                        if wrap_allowed and (
-                            limited_reader.over_limit or limited_reader.bytes_received > limit
-                        ):
-                            return process_response(
-                                ResponseModel(
-                                    status_code=413,
-                                    error_code='REQ001',
-                                    error_message=f'Request entity too large (max: {limit} bytes)',
-                                ).dict(),
-                                'rest',
-                            )
-                    except Exception:
-                        pass
-                    raise
-
-        return await call_next(request)
-    except Exception as e:
+    if ('chunked' in transfer_encoding or not cl) and request.method in ('POST', 'PUT', 'PATCH'):
+        wrap_allowed = True
         try:
-            from models.response_model import ResponseModel as _RM
-            from utils.response_util import process_response as _pr
+            env_flag = os.getenv('DISABLE_PLATFORM_CHUNKED_WRAP')
+            if isinstance(env_flag, str) and env_flag.strip() != '':
+                if env_flag.strip().lower() in ('1', 'true', 'yes', 'on'):
+                    wrap_allowed = False
+            if str(path) == '/platform/authorization':
+                wrap_allowed = True
         except Exception:
-            _RM = None
-            _pr = None
+            pass
 
-        msg = str(e)
-        gateway_logger.error(f'Body size limit middleware error: {msg}', exc_info=True)
+        if wrap_allowed:
+            limited_reader = LimitedStreamReader(receive, limit)
+            started = False
+            replaced = False
 
-        swallow = False
-        try:
-            if isinstance(e, RuntimeError) and 'No response returned' in msg:
-                swallow = True
-            else:
+            async def _reject():
+                nonlocal started, replaced
+                started = replaced = True
                 try:
-                    import anyio
+                    from utils.audit_util import audit
 
-                    if isinstance(e, getattr(anyio, 'EndOfStream', tuple())):
-                        swallow = True
+                    audit(
+                        request,
+                        actor=None,
+                        action='request.body_size_exceeded',
+                        target=path,
+                        status='blocked',
+                        details={
+                            'bytes_received': limited_reader.bytes_received,
+                            'limit': limit,
+                            'content_type': request.headers.get('content-type'),
+                            'transfer_encoding': transfer_encoding or 'chunked',
+                        },
+                    )
                 except Exception:
                     pass
-        except Exception:
-            pass
-
-        if swallow and _RM and _pr:
-            try:
-                return _pr(
-                    _RM(
-                        status_code=500,
-                        error_code='GTW998',
-                        error_message='Upstream handler failed to produce a response',
-                    ).dict(),
-                    'rest',
-                )
-            except Exception:
-                pass
-
-        raise
-
-
-class PlatformCORSMiddleware:
-    """ASGI-level CORS for /platform/* routes only.
-
-    API-level CORS is enforced in gateway routes. This middleware should not
-    interfere with /api/* paths. It also respects DISABLE_PLATFORM_CORS_ASGI:
-    when set to true, this middleware becomes a no-op.
-    """
-
-    def __init__(self, app):
-        self.app = app
-
-    async def __call__(self, scope, receive, send):
-        # If explicitly disabled, act as a passthrough
-        try:
-            if os.getenv('DISABLE_PLATFORM_CORS_ASGI', 'false').lower() in (
-                '1',
-                'true',
-                'yes',
-                'on',
-            ):
-                return await self.app(scope, receive, send)
-        except Exception:
-            pass
-
-        try:
-            if scope.get('type') != 'http':
-                return await self.app(scope, receive, send)
-            path = str(scope.get('path') or '')
-            # Only handle platform routes here; leave /api/* to route handlers
-            if not (path.startswith('/platform/') or path == '/platform'):
-                return await self.app(scope, receive, send)
-
-            cfg = _platform_cors_config()
-            hdrs = {}
-            try:
-                for k, v in scope.get('headers') or []:
-                    hdrs[k.decode('latin1').lower()] = v.decode('latin1')
-            except Exception:
-                pass
-            origin = hdrs.get('origin')
-
-            # Evaluate origin allowance based on config
-            origin_allowed = False
-            if origin:
-                if '*' in cfg['origins']:
-                    if cfg['strict'] and cfg['credentials']:
-                        lo = origin.lower()
-                        origin_allowed = (
-                            lo.startswith('http://localhost')
-                            or lo.startswith('https://localhost')
-                            or lo.startswith('http://127.0.0.1')
-                            or lo.startswith('https://127.0.0.1')
-                        )
-                    else:
-                        origin_allowed = True
-                else:
-                    origin_allowed = origin in cfg['origins']
-
-            if str(scope.get('method', '')).upper() == 'OPTIONS':
-                headers = []
-                if origin_allowed and origin:
-                    headers.append((b'access-control-allow-origin', origin.encode('latin1')))
-                    headers.append((b'vary', b'Origin'))
-                else:
-                    try:
-                        if origin and '*' in cfg['origins'] and cfg['strict'] and cfg['credentials']:
-                            headers.append((b'access-control-allow-origin', b''))
-                    except Exception:
-                        pass
-                headers.append(
-                    (b'access-control-allow-methods', ', '.join(cfg['methods']).encode('latin1'))
-                )
-                headers.append(
-                    (b'access-control-allow-headers', ', '.join(cfg['headers']).encode('latin1'))
-                )
-                if cfg['credentials']:
-                    headers.append((b'access-control-allow-credentials', b'true'))
-                rid = hdrs.get('x-request-id')
-                if rid:
-                    headers.append((b'request_id', rid.encode('latin1')))
-                await send({'type': 'http.response.start', 'status': 204, 'headers': headers})
-                await send({'type': 'http.response.body', 'body': b''})
-                return
+                await _body_too_large(limit)(scope, receive, send)
 
             async def send_wrapper(message):
-                # Do not modify non-OPTIONS responses here; platform HTTP middleware handles
-                # response headers to avoid duplicates.
+                nonlocal started
+                if replaced:
+                    # The app's own response is dropped once the 413 went out
+                    return
+                if message['type'] == 'http.response.start':
+                    if limited_reader.over_limit:
+                        return await _reject()
+                    started = True
                 await send(message)
 
-            return await self.app(scope, receive, send_wrapper)
-        except Exception:
-            return await self.app(scope, receive, send)
+            try:
+                await call_next(scope, limited_reader, send_wrapper)
+            except Exception:
+                if limited_reader.over_limit and not started:
+                    return await _reject()
+                raise
+            return
 
+    await call_next(scope, receive, send)
 
-doorman.add_middleware(PlatformCORSMiddleware)
-doorman.add_middleware(GlobalLoggingMiddleware)
 
 # Add tier-based rate limiting middleware (skip in live/test to avoid 429 floods)
+_tier_stage = None
 try:
     from middleware.tier_rate_limit_middleware import TierRateLimitMiddleware
     import os as _os
@@ -1505,15 +1389,8 @@ try:
     _skip_tier = _os.getenv('SKIP_TIER_RATE_LIMIT', '').lower() in (
         '1', 'true', 'yes', 'on'
     )
-    _live = _os.getenv('DOORMAN_RUN_LIVE', '').lower() in ('1', 'true', 'yes', 'on')
-    try:
-        import sys as __sys
-
-        _is_pytest = 'PYTEST_CURRENT_TEST' in _os.environ or 'pytest' in __sys.modules
-    except Exception:
-        _is_pytest = False
     if not _skip_tier:
-        doorman.add_middleware(TierRateLimitMiddleware)
+        _tier_stage = TierRateLimitMiddleware()
         logging.getLogger('doorman.gateway').info('Tier-based rate limiting middleware enabled')
     else:
         logging.getLogger('doorman.gateway').info('Tier-based rate limiting middleware skipped')
@@ -1523,10 +1400,11 @@ except Exception as e:
     )
 
 
-@doorman.middleware('http')
-async def request_id_middleware(request: Request, call_next):
+@pipeline_stage()
+async def request_id_middleware(scope, receive, send, call_next):
+    request = get_request(scope)
     try:
-        from utils.correlation_util import get_correlation_id, set_correlation_id
+        from utils.correlation_util import correlation_id, get_correlation_id
 
         rid = (
             getattr(request.state, 'request_id', None)
@@ -1542,8 +1420,9 @@ async def request_id_middleware(request: Request, call_next):
         if not hasattr(request.state, 'request_id'):
             request.state.request_id = rid
 
-        # Ensure correlation ID is set
-        set_correlation_id(rid)
+        # Ensure correlation ID is set for this request only; stages share the
+        # caller's context, so restore it afterwards instead of leaking it
+        cid_token = correlation_id.set(rid)
 
         # Optional logging
         try:
@@ -1557,75 +1436,77 @@ async def request_id_middleware(request: Request, call_next):
         except Exception:
             pass
 
-        response = await call_next(request)
-        
+        def _set_request_id(message, headers):
+            try:
+                headers['X-Request-ID'] = rid
+                headers['request_id'] = rid
+            except Exception as e:
+                gateway_logger.warning(f'Failed to set response headers: {str(e)}')
+
         try:
-            response.headers['X-Request-ID'] = rid
-            response.headers['request_id'] = rid
-        except Exception as e:
-            gateway_logger.warning(f'Failed to set response headers: {str(e)}')
-            
-        return response
+            await call_next(scope, receive, on_response_start(send, _set_request_id))
+        finally:
+            correlation_id.reset(cid_token)
     except Exception as e:
         gateway_logger.error(f'Request ID middleware error: {str(e)}', exc_info=True)
         raise
 
 
-@doorman.middleware('http')
-async def security_headers(request: Request, call_next):
-    response = await call_next(request)
-    try:
-        response.headers.setdefault('X-Content-Type-Options', 'nosniff')
-        response.headers.setdefault('X-Frame-Options', 'DENY')
-        response.headers.setdefault('Referrer-Policy', 'no-referrer')
-        response.headers.setdefault(
-            'Permissions-Policy', 'geolocation=(), microphone=(), camera=()'
-        )
+@pipeline_stage()
+async def security_headers(scope, receive, send, call_next):
+    _path = str(scope.get('path') or '')
 
+    def _apply(message, headers):
         try:
-            # Relax CSP for interactive docs to allow required scripts/styles
-            _path = str(getattr(getattr(request, 'url', None), 'path', '') or '')
-            csp_env = os.getenv('CONTENT_SECURITY_POLICY')
-            if csp_env is not None and csp_env.strip():
-                csp = csp_env
-            else:
-                if _path.startswith('/platform/docs') or _path.startswith('/platform/redoc'):
-                    # Allow Swagger/Redoc assets from jsDelivr and embedding in iframes
-                    csp = (
-                        "default-src 'self'; "
-                        "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-                        "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-                        "img-src 'self' data: https://cdn.jsdelivr.net; "
-                        "font-src 'self' data: https://cdn.jsdelivr.net; "
-                        "connect-src 'self'; "
-                        "frame-ancestors *; "
-                        "base-uri 'self';"
-                    )
-                    try:
-                        # Remove X-Frame-Options to allow embedding via frame-ancestors
-                        if 'X-Frame-Options' in response.headers:
-                            del response.headers['X-Frame-Options']
-                    except Exception:
-                        pass
+            headers.setdefault('X-Content-Type-Options', 'nosniff')
+            headers.setdefault('X-Frame-Options', 'DENY')
+            headers.setdefault('Referrer-Policy', 'no-referrer')
+            headers.setdefault('Permissions-Policy', 'geolocation=(), microphone=(), camera=()')
+
+            try:
+                # Relax CSP for interactive docs to allow required scripts/styles
+                csp_env = os.getenv('CONTENT_SECURITY_POLICY')
+                if csp_env is not None and csp_env.strip():
+                    csp = csp_env
                 else:
-                    csp = (
-                        "default-src 'none'; "
-                        "frame-ancestors 'none'; "
-                        "base-uri 'none'; "
-                        "form-action 'self'; "
-                        "img-src 'self' data:; "
-                        "connect-src 'self';"
-                    )
-            response.headers.setdefault('Content-Security-Policy', csp)
+                    if _path.startswith('/platform/docs') or _path.startswith('/platform/redoc'):
+                        # Allow Swagger/Redoc assets from jsDelivr and embedding in iframes
+                        csp = (
+                            "default-src 'self'; "
+                            "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+                            "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+                            "img-src 'self' data: https://cdn.jsdelivr.net; "
+                            "font-src 'self' data: https://cdn.jsdelivr.net; "
+                            "connect-src 'self'; "
+                            "frame-ancestors *; "
+                            "base-uri 'self';"
+                        )
+                        try:
+                            # Remove X-Frame-Options to allow embedding via frame-ancestors
+                            if 'X-Frame-Options' in headers:
+                                del headers['X-Frame-Options']
+                        except Exception:
+                            pass
+                    else:
+                        csp = (
+                            "default-src 'none'; "
+                            "frame-ancestors 'none'; "
+                            "base-uri 'none'; "
+                            "form-action 'self'; "
+                            "img-src 'self' data:; "
+                            "connect-src 'self';"
+                        )
+                headers.setdefault('Content-Security-Policy', csp)
+            except Exception:
+                pass
+            if os.getenv('HTTPS_ONLY', 'false').lower() == 'true':
+                headers.setdefault(
+                    'Strict-Transport-Security', 'max-age=15552000; includeSubDomains; preload'
+                )
         except Exception:
             pass
-        if os.getenv('HTTPS_ONLY', 'false').lower() == 'true':
-            response.headers.setdefault(
-                'Strict-Transport-Security', 'max-age=15552000; includeSubDomains; preload'
-            )
-    except Exception:
-        pass
-    return response
+
+    await call_next(scope, receive, on_response_start(send, _apply))
 
 
 """Logging configuration
@@ -1663,7 +1544,7 @@ _fmt_is_json = os.getenv('LOG_FORMAT', 'plain').lower() == 'json'
 _file_handler = None
 try:
     os.makedirs(LOGS_DIR, exist_ok=True)
-    _file_handler = RotatingFileHandler(
+    _file_handler = BatchRotatingFileHandler(
         filename=os.path.join(LOGS_DIR, 'doorman.log'),
         maxBytes=10 * 1024 * 1024,
         backupCount=5,
@@ -1679,7 +1560,7 @@ except Exception as _e:
     try:
         _tmp_dir = '/tmp/doorman-logs'
         os.makedirs(_tmp_dir, exist_ok=True)
-        _file_handler = RotatingFileHandler(
+        _file_handler = BatchRotatingFileHandler(
             filename=os.path.join(_tmp_dir, 'doorman.log'),
             maxBytes=10 * 1024 * 1024,
             backupCount=5,
@@ -1700,7 +1581,19 @@ except Exception as _e:
         _file_handler = None
 
 
-# Configure all doorman loggers to use the same handler and prevent propagation
+_console_handler = BatchStreamHandler(stream=sys.stdout)
+_console_handler.setLevel(getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO))
+_console_handler.setFormatter(
+    JSONFormatter()
+    if _fmt_is_json
+    else logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(request_id)s | %(message)s')
+)
+log_pipeline.add_sink(_console_handler)
+if _file_handler is not None:
+    log_pipeline.add_sink(_file_handler)
+
+
+# Configure all doorman loggers to share the log pipeline and prevent propagation
 def configure_logger(logger_name: str) -> logging.Logger:
     logger = logging.getLogger(logger_name)
     log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
@@ -1711,107 +1604,17 @@ def configure_logger(logger_name: str) -> logging.Logger:
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
 
-    from utils.correlation_util import correlation_id, RequestIdFilter
-
-    class RedactFilter(logging.Filter):
-        """Comprehensive logging redaction filter for sensitive data.
-
-        Redacts:
-        - Authorization headers (Bearer, Basic, API-Key, etc.)
-        - Access/refresh tokens
-        - Passwords and secrets
-        - Cookies and session data
-        - API keys and credentials
-        - CSRF tokens
-        """
-
-        PATTERNS = [
-            re.compile(r'(?i)(authorization\s*[:=]\s*)([^;\r\n]+)'),
-            re.compile(r'(?i)(x-api-key\s*[:=]\s*)([^;\r\n]+)'),
-            re.compile(r'(?i)(api[_-]?key\s*[:=]\s*)([^;\r\n]+)'),
-            re.compile(r'(?i)(api[_-]?secret\s*[:=]\s*)([^;\r\n]+)'),
-            re.compile(r'(?i)(access[_-]?token\s*["\']?\s*[:=]\s*["\']?)([^"\';\r\n\s]+)(["\']?)'),
-            re.compile(r'(?i)(refresh[_-]?token\s*["\']?\s*[:=]\s*["\']?)([^"\';\r\n\s]+)(["\']?)'),
-            re.compile(r'(?i)(token\s*["\']?\s*[:=]\s*["\']?)([a-zA-Z0-9_\-\.]{20,})(["\']?)'),
-            re.compile(r'(?i)(password\s*["\']?\s*[:=]\s*["\']?)([^"\';\r\n]+)(["\']?)'),
-            re.compile(r'(?i)(secret\s*["\']?\s*[:=]\s*["\']?)([^"\';\r\n\s]+)(["\']?)'),
-            re.compile(r'(?i)(client[_-]?secret\s*["\']?\s*[:=]\s*["\']?)([^"\';\r\n\s]+)(["\']?)'),
-            re.compile(r'(?i)(cookie\s*[:=]\s*)([^;\r\n]+)'),
-            re.compile(r'(?i)(set-cookie\s*[:=]\s*)([^;\r\n]+)'),
-            re.compile(r'(?i)(x-csrf-token\s*[:=]\s*["\']?)([^"\';\r\n\s]+)(["\']?)'),
-            re.compile(r'(?i)(csrf[_-]?token\s*["\']?\s*[:=]\s*["\']?)([^"\';\r\n\s]+)(["\']?)'),
-            re.compile(r'\b(eyJ[a-zA-Z0-9_\-]+\.eyJ[a-zA-Z0-9_\-]+\.[a-zA-Z0-9_\-]+)\b'),
-            re.compile(r'(?i)(session[_-]?id\s*["\']?\s*[:=]\s*["\']?)([^"\';\r\n\s]+)(["\']?)'),
-            re.compile(
-                r'(-----BEGIN[A-Z\s]+PRIVATE KEY-----)(.*?)(-----END[A-Z\s]+PRIVATE KEY-----)',
-                re.DOTALL,
-            ),
-        ]
-
-        def filter(self, record: logging.LogRecord) -> bool:
-            try:
-                msg = str(record.getMessage())
-                red = msg
-
-                for pat in self.PATTERNS:
-                    if pat.groups == 3 and pat.flags & re.DOTALL:
-                        red = pat.sub(r'\1[REDACTED]\3', red)
-                    elif pat.groups >= 2:
-                        red = pat.sub(
-                            lambda m: (
-                                m.group(1)
-                                + '[REDACTED]'
-                                + (m.group(3) if m.lastindex and m.lastindex >= 3 else '')
-                            ),
-                            red,
-                        )
-                    else:
-                        red = pat.sub('[REDACTED]', red)
-
-                if red != msg:
-                    record.msg = red
-                    if hasattr(record, 'args') and record.args:
-                        try:
-                            if isinstance(record.args, dict):
-                                record.args = {
-                                    k: '[REDACTED]'
-                                    if 'token' in str(k).lower()
-                                    or 'password' in str(k).lower()
-                                    or 'secret' in str(k).lower()
-                                    or 'authorization' in str(k).lower()
-                                    else v
-                                    for k, v in record.args.items()
-                                }
-                        except Exception:
-                            pass
-            except Exception:
-                pass
-            return True
-
-    console = logging.StreamHandler(stream=sys.stdout)
-    console.setLevel(numeric_level)
-    console.setFormatter(
-        JSONFormatter()
-        if _fmt_is_json
-        else logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(request_id)s | %(message)s')
-    )
-    console.addFilter(RequestIdFilter())
-    console.addFilter(RedactFilter())
-    logger.addHandler(console)
+    from utils.correlation_util import RequestIdFilter
 
-    if _file_handler is not None:
-        if not any(
-            isinstance(f, logging.Filter) and hasattr(f, 'PATTERNS') for f in _file_handler.filters
-        ):
-            _file_handler.addFilter(RequestIdFilter())
-            _file_handler.addFilter(RedactFilter())
-        logger.addHandler(_file_handler)
+    # Request id and redaction run once per record, before it is queued
+    log_pipeline.attach(logger, RequestIdFilter(), RedactFilter())
     return logger
 
 
 gateway_logger = configure_logger('doorman.gateway')
 logging_logger = configure_logger('doorman.logging')
 
+_chaos_stages = []
 # Attach in-memory logging handler so logs remain queryable when file logging
 # is not available (e.g., AWS deployments writing to stdout only).
 try:
@@ -1822,9 +1625,8 @@ try:
         _lvl = os.getenv('LOG_LEVEL', 'INFO').upper()
         _num_lvl = getattr(logging, _lvl, logging.INFO)
         _mem_handler = MemoryLogHandler(level=_num_lvl)
+        log_pipeline.add_sink(_mem_handler)
         for _name in (
-            'doorman.gateway',
-            'doorman.logging',
             'doorman.analytics',
             'doorman.audit',
         ):
@@ -1843,13 +1645,12 @@ except Exception as _e:
         pass
 
     # Security Audit Middleware (should be close to top to catch all requests)
-    doorman.add_middleware(SecurityAuditMiddleware)
-
-    # Latency Injection (Chaos Mode)
-    doorman.add_middleware(LatencyInjectionMiddleware)
+    # and Latency Injection (Chaos Mode)
+    _chaos_stages.extend([LatencyInjectionMiddleware(), SecurityAuditMiddleware()])
 
 # Add GZip compression for responses > 1KB(configurable via environment variables)
 # This should be added early in the middleware stack so it compresses final responses
+_gzip_stage = None
 try:
     compression_enabled = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
     if compression_enabled:
@@ -1863,7 +1664,7 @@ try:
             )
             compression_level = 1
 
-        doorman.add_middleware(
+        _gzip_stage = MiddlewareStage(
             GZipMiddleware, minimum_size=compression_minimum_size, compresslevel=compression_level
         )
         gateway_logger.info(
@@ -1877,24 +1678,13 @@ except Exception as e:
 
 
 # Ensure platform responses set Vary=Origin (and not Accept-Encoding) for CORS tests.
-class _VaryOriginMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-        try:
-            p = str(request.url.path)
-            if p.startswith('/platform/'):
-                # Force Vary to exactly 'Origin'
-                try:
-                    _ = response.headers.pop('Vary', None)
-                except Exception:
-                    pass
-                response.headers['Vary'] = 'Origin'
-        except Exception:
-            pass
-        return response
+@pipeline_stage(prefixes=('/platform/',))
+async def vary_origin(scope, receive, send, call_next):
+    def _force_vary(message, headers):
+        # Force Vary to exactly 'Origin'
+        headers['Vary'] = 'Origin'
 
-
-doorman.add_middleware(_VaryOriginMiddleware)
+    await call_next(scope, receive, on_response_start(send, _force_vary))
 
 # Now that logging is configured, attempt to migrate any legacy 'generated/' dir
 try:
@@ -1957,13 +1747,11 @@ class Settings(BaseSettings):
     )
 
 
-@doorman.middleware('http')
-async def ip_filter_middleware(request: Request, call_next):
+@pipeline_stage(exclude=('/platform/security/settings',))
+async def ip_filter_middleware(scope, receive, send, call_next):
+    request = get_request(scope)
+    denied = None
     try:
-        path = str(request.url.path)
-        if path == '/platform/security/settings':
-            return await call_next(request)
-
         settings = get_cached_settings()
         wl = settings.get('ip_whitelist') or []
         bl = settings.get('ip_blacklist') or []
@@ -1971,10 +1759,8 @@ async def ip_filter_middleware(request: Request, call_next):
         client_ip = _policy_get_client_ip(request, trust_xff)
         xff_hdr = request.headers.get('x-forwarded-for') or request.headers.get('X-Forwarded-For')
 
+        local_bypass = False
         try:
-            import os
-
-            settings = get_cached_settings()
             env_flag = os.getenv('LOCAL_HOST_IP_BYPASS')
             allow_local = (
                 (env_flag.lower() == 'true')
@@ -1996,39 +1782,18 @@ async def ip_filter_middleware(request: Request, call_next):
                         'Forwarded',
                     )
                 )
-                if direct_ip and _policy_is_loopback(direct_ip) and not has_forward:
-                    return await call_next(request)
+                local_bypass = bool(
+                    direct_ip and _policy_is_loopback(direct_ip) and not has_forward
+                )
         except Exception:
             pass
 
-        if client_ip:
-            if wl and not _policy_ip_in_list(client_ip, wl):
-                try:
-                    audit(
-                        request,
-                        actor=None,
-                        action='ip.global_deny',
-                        target=client_ip,
-                        status='blocked',
-                        details={
-                            'reason': 'not_in_whitelist',
-                            'xff': xff_hdr,
-                            'source_ip': getattr(getattr(request, 'client', None), 'host', None),
-                        },
-                    )
-                except Exception:
-                    pass
-                from fastapi.responses import JSONResponse
-
-                return JSONResponse(
-                    status_code=403,
-                    content={
-                        'status_code': 403,
-                        'error_code': 'SEC010',
-                        'error_message': 'IP not allowed',
-                    },
-                )
-            if bl and _policy_ip_in_list(client_ip, bl):
+        if client_ip and not local_bypass:
+            if wl and not _policy_ip_in_list(client_ip, wl, 'ip_whitelist'):
+                denied = ('not_in_whitelist', 'SEC010', 'IP not allowed')
+            elif bl and _policy_ip_in_list(client_ip, bl, 'ip_blacklist'):
+                denied = ('blacklisted', 'SEC011', 'IP blocked')
+            if denied:
                 try:
                     audit(
                         request,
@@ -2037,142 +1802,52 @@ async def ip_filter_middleware(request: Request, call_next):
                         target=client_ip,
                         status='blocked',
                         details={
-                            'reason': 'blacklisted',
+                            'reason': denied[0],
                             'xff': xff_hdr,
                             'source_ip': getattr(getattr(request, 'client', None), 'host', None),
                         },
                     )
                 except Exception:
                     pass
-                from fastapi.responses import JSONResponse
-
-                return JSONResponse(
-                    status_code=403,
-                    content={
-                        'status_code': 403,
-                        'error_code': 'SEC011',
-                        'error_message': 'IP blocked',
-                    },
-                )
     except Exception:
-        pass
-    return await call_next(request)
+        denied = None
 
+    if denied:
+        from fastapi.responses import JSONResponse
 
-@doorman.middleware('http')
-async def metrics_middleware(request: Request, call_next):
-    start = asyncio.get_event_loop().time()
-
-    def _parse_len(val: str | None) -> int:
-        try:
-            return int(val) if val is not None else 0
-        except Exception:
-            return 0
-
-    # Include request headers size plus body length if present
-    try:
-        _req_hdr_bytes = sum(len(k) + len(v) for k, v in (request.headers or {}).items())
-    except Exception:
-        _req_hdr_bytes = 0
-    _req_body_len = _parse_len(request.headers.get('content-length'))
-    bytes_in = _req_hdr_bytes + _req_body_len
-    response = None
-    try:
-        response = await call_next(request)
-        return response
-    finally:
-        try:
-            if str(request.url.path).startswith('/api/'):
-                end = asyncio.get_event_loop().time()
-                duration_ms = (end - start) * 1000.0
-                status = getattr(response, 'status_code', 500) if response is not None else 500
-                username = None
-                api_key = None
-
-                try:
-                    from utils.auth_util import auth_required as _auth_required
-
-                    payload = await _auth_required(request)
-                    username = payload.get('sub') if isinstance(payload, dict) else None
-                except Exception:
-                    pass
-
-                p = str(request.url.path)
-                if p.startswith('/api/rest/'):
-                    parts = p.split('/')
-                    try:
-                        idx = parts.index('rest')
-                        api_key = (
-                            f'rest:{parts[idx + 1]}'
-                            if len(parts) > idx + 1 and parts[idx + 1]
-                            else 'rest:unknown'
-                        )
-                    except ValueError:
-                        api_key = 'rest:unknown'
-                elif p.startswith('/api/graphql/'):
-                    seg = p.rsplit('/', 1)[-1] or 'unknown'
-                    api_key = f'graphql:{seg}'
-                elif p.startswith('/api/soap/'):
-                    seg = p.rsplit('/', 1)[-1] or 'unknown'
-                    api_key = f'soap:{seg}'
-                # Include response headers size plus body length if present
-                clen = 0
-                try:
-                    headers = getattr(response, 'headers', {}) or {}
-                    _resp_hdr_bytes = sum(len(k) + len(v) for k, v in headers.items())
-                    clen = _parse_len(headers.get('content-length'))
-                    if clen == 0:
-                        # Fallback to explicit body length header set by response_util
-                        clen = _parse_len(headers.get('x-body-length'))
-                    if clen == 0:
-                        body = getattr(response, 'body', None)
-                        if isinstance(body, (bytes, bytearray)):
-                            clen = len(body)
-                    clen = _resp_hdr_bytes + clen
-                except Exception:
-                    clen = 0
-
-                # Only record monitor metrics for API traffic; exclude platform endpoints
-                if p.startswith('/api/'):
-                    metrics_store.record(
-                        status=status,
-                        duration_ms=duration_ms,
-                        username=username,
-                        api_key=api_key,
-                        bytes_in=bytes_in,
-                        bytes_out=clen,
-                    )
-                try:
-                    if username:
-                        from utils.bandwidth_util import _get_user, add_usage
-
-                        u = _get_user(username)
-                        if (
-                            u
-                            and u.get('bandwidth_limit_bytes')
-                            and u.get('bandwidth_limit_enabled') is not False
-                        ):
-                            add_usage(
-                                username,
-                                int(bytes_in) + int(clen),
-                                u.get('bandwidth_limit_window') or 'day',
-                            )
-                except Exception:
-                    pass
-                try:
-                    # Normalize platform CORS Vary header last to avoid gzip appending
-                    if str(request.url.path).startswith('/platform/'):
-                        headers = getattr(response, 'headers', None)
-                        if headers is not None:
-                            try:
-                                _ = headers.pop('Vary', None)
-                            except Exception:
-                                pass
-                            headers['Vary'] = 'Origin'
-                except Exception:
-                    pass
-        except Exception:
-            pass
+        response = JSONResponse(
+            status_code=403,
+            content={'status_code': 403, 'error_code': denied[1], 'error_message': denied[2]},
+        )
+        return await response(scope, receive, send)
+    await call_next(scope, receive, send)
+
+
+# Request pipeline, outermost stage first. Each stage declares the paths it
+# applies to, so e.g. platform CORS never runs for /api/* and request
+# accounting never runs for /platform/*; the applicable stages are chosen once
+# per request.
+doorman.add_middleware(
+    GatewayPipeline,
+    stages=[
+        stage
+        for stage in (
+            AnalyticsMiddleware(),
+            ip_filter_middleware,
+            vary_origin,
+            _gzip_stage,
+            *_chaos_stages,
+            security_headers,
+            request_id_middleware,
+            _tier_stage,
+            GlobalLoggingMiddleware(),
+            platform_cors,
+            body_size_limit,
+            forwarded_proto_middleware,
+        )
+        if stage is not None
+    ],
+)
 
 
 async def automatic_purger(interval_seconds):
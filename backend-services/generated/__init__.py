@@ -0,0 +1 @@
+"""Generated gRPC code."""
@@ -0,0 +1,226 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+import warnings
+
+import envgrpc_v1_pb2 as envgrpc__v1__pb2
+
+GRPC_GENERATED_VERSION = '1.75.0'
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+    _version_not_supported = first_version_is_lower(GRPC_VERSION, GRPC_GENERATED_VERSION)
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f'The grpc package installed is at version {GRPC_VERSION},'
+        + f' but the generated code in envgrpc_v1_pb2_grpc.py depends on'
+        + f' grpcio>={GRPC_GENERATED_VERSION}.'
+        + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
+        + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
+    )
+
+
+class ResourceStub(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Create = channel.unary_unary(
+                '/envgrpc_v1.Resource/Create',
+                request_serializer=envgrpc__v1__pb2.CreateRequest.SerializeToString,
+                response_deserializer=envgrpc__v1__pb2.CreateReply.FromString,
+                _registered_method=True)
+        self.Read = channel.unary_unary(
+                '/envgrpc_v1.Resource/Read',
+                request_serializer=envgrpc__v1__pb2.ReadRequest.SerializeToString,
+                response_deserializer=envgrpc__v1__pb2.ReadReply.FromString,
+                _registered_method=True)
+        self.Update = channel.unary_unary(
+                '/envgrpc_v1.Resource/Update',
+                request_serializer=envgrpc__v1__pb2.UpdateRequest.SerializeToString,
+                response_deserializer=envgrpc__v1__pb2.UpdateReply.FromString,
+                _registered_method=True)
+        self.Delete = channel.unary_unary(
+                '/envgrpc_v1.Resource/Delete',
+                request_serializer=envgrpc__v1__pb2.DeleteRequest.SerializeToString,
+                response_deserializer=envgrpc__v1__pb2.DeleteReply.FromString,
+                _registered_method=True)
+
+
+class ResourceServicer(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def Create(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Read(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Update(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Delete(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_ResourceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'Create': grpc.unary_unary_rpc_method_handler(
+                    servicer.Create,
+                    request_deserializer=envgrpc__v1__pb2.CreateRequest.FromString,
+                    response_serializer=envgrpc__v1__pb2.CreateReply.SerializeToString,
+            ),
+            'Read': grpc.unary_unary_rpc_method_handler(
+                    servicer.Read,
+                    request_deserializer=envgrpc__v1__pb2.ReadRequest.FromString,
+                    response_serializer=envgrpc__v1__pb2.ReadReply.SerializeToString,
+            ),
+            'Update': grpc.unary_unary_rpc_method_handler(
+                    servicer.Update,
+                    request_deserializer=envgrpc__v1__pb2.UpdateRequest.FromString,
+                    response_serializer=envgrpc__v1__pb2.UpdateReply.SerializeToString,
+            ),
+            'Delete': grpc.unary_unary_rpc_method_handler(
+                    servicer.Delete,
+                    request_deserializer=envgrpc__v1__pb2.DeleteRequest.FromString,
+                    response_serializer=envgrpc__v1__pb2.DeleteReply.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'envgrpc_v1.Resource', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('envgrpc_v1.Resource', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class Resource(object):
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def Create(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/envgrpc_v1.Resource/Create',
+            envgrpc__v1__pb2.CreateRequest.SerializeToString,
+            envgrpc__v1__pb2.CreateReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Read(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/envgrpc_v1.Resource/Read',
+            envgrpc__v1__pb2.ReadRequest.SerializeToString,
+            envgrpc__v1__pb2.ReadReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Update(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/envgrpc_v1.Resource/Update',
+            envgrpc__v1__pb2.UpdateRequest.SerializeToString,
+            envgrpc__v1__pb2.UpdateReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Delete(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/envgrpc_v1.Resource/Delete',
+            envgrpc__v1__pb2.DeleteRequest.SerializeToString,
+            envgrpc__v1__pb2.DeleteReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: gbidimap_v1.proto
+# Protobuf Python Version: 6.31.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    6,
+    31,
+    1,
+    '',
+    'gbidimap_v1.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11gbidimap_v1.proto\x12\x0bgbidimap_v1\"\x1d\n\rCreateRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\"\x1e\n\x0b\x43reateReply\x12\x0f\n\x07message\x18\x01 \x01(\t\"\x19\n\x0bReadRequest\x12\n\n\x02id\x18\x01 \x01(\x05\"\x1c\n\tReadReply\x12\x0f\n\x07message\x18\x01 \x01(\t\")\n\rUpdateRequest\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\"\x1e\n\x0bUpdateReply\x12\x0f\n\x07message\x18\x01 \x01(\t\"\x1b\n\rDeleteRequest\x12\n\n\x02id\x18\x01 \x01(\x05\"\x19\n\x0b\x44\x65leteReply\x12\n\n\x02ok\x18\x01 \x01(\x08\x32\x8c\x02\n\x08Resource\x12@\n\x06\x43reate\x12\x1a.gbidimap_v1.CreateRequest\x1a\x18.gbidimap_v1.CreateReply\"\x00\x12:\n\x04Read\x12\x18.gbidimap_v1.ReadRequest\x1a\x16.gbidimap_v1.ReadReply\"\x00\x12@\n\x06Update\x12\x1a.gbidimap_v1.UpdateRequest\x1a\x18.gbidimap_v1.UpdateReply\"\x00\x12@\n\x06\x44\x65lete\x12\x1a.gbidimap_v1.DeleteRequest\x1a\x18.gbidimap_v1.DeleteReply\"\x00\x62\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'gbidimap_v1_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_CREATEREQUEST']._serialized_start=34
+  _globals['_CREATEREQUEST']._serialized_end=63
+  _globals['_CREATEREPLY']._serialized_start=65
+  _globals['_CREATEREPLY']._serialized_end=95
+  _globals['_READREQUEST']._serialized_start=97
+  _globals['_READREQUEST']._serialized_end=122
+  _globals['_READREPLY']._serialized_start=124
+  _globals['_READREPLY']._serialized_end=152
+  _globals['_UPDATEREQUEST']._serialized_start=154
+  _globals['_UPDATEREQUEST']._serialized_end=195
+  _globals['_UPDATEREPLY']._serialized_start=197
+  _globals['_UPDATEREPLY']._serialized_end=227
+  _globals['_DELETEREQUEST']._serialized_start=229
+  _globals['_DELETEREQUEST']._serialized_end=256
+  _globals['_DELETEREPLY']._serialized_start=258
+  _globals['_DELETEREPLY']._serialized_end=283
+  _globals['_RESOURCE']._serialized_start=286
+  _globals['_RESOURCE']._serialized_end=554
+# @@protoc_insertion_point(module_scope)
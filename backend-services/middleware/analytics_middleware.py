@@ -1,46 +1,45 @@
 """
-Analytics middleware for capturing request/response metrics.
+Request accounting stage.
 
-Automatically records detailed metrics for every request passing through
-the gateway, including per-endpoint tracking and full performance data.
+Measures every API request once (duration, request/response sizes, api key,
+user) and hands a single record to utils.request_accounting_util, which fans
+it out to the analytics, monitor and Prometheus sinks off the request path
+and batches bandwidth usage.
 """
 
 import logging
-import os
 import time
-from collections.abc import Callable
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.datastructures import Headers
 
-from utils.enhanced_metrics_util import enhanced_metrics_store
-from utils.metrics_util import metrics_store
-from utils.prometheus_metrics import observe_request
+from middleware.gateway_pipeline import PipelineStage, get_request
+from utils.request_accounting_util import RequestRecord, request_accounting
 
 logger = logging.getLogger('doorman.analytics')
 
 
-class AnalyticsMiddleware(BaseHTTPMiddleware):
+class AnalyticsMiddleware(PipelineStage):
     """
-    Middleware to capture comprehensive request/response metrics.
+    Pipeline stage that accounts each API request exactly once.
 
     Records:
     - Response time
     - Status code
-    - User (from auth)
+    - User (from the auth context the route already computed)
     - API name and version
     - Endpoint URI and method
     - Request/response sizes
     """
 
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
+    name = 'request_accounting'
+    # Only API traffic is recorded; platform endpoints are excluded
+    prefixes = ('/api/',)
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope, receive, send, call_next):
         """
         Process request and record metrics.
         """
+        request = get_request(scope)
         # Start timing
         start_time = time.time()
 
@@ -52,133 +51,135 @@ class AnalyticsMiddleware(BaseHTTPMiddleware):
         request_size = 0
         try:
             # Request line: "METHOD /path?query HTTP/1.1\r\n"
-            request_line = f"{request.method} {request.url.path}"
-            if request.url.query:
-                request_line += f"?{request.url.query}"
-            request_line += " HTTP/1.1\r\n"
-            request_size += len(request_line)
-            
+            request_size += len(method) + len(path) + len(' HTTP/1.1\r\n') + 1
+            query = scope.get('query_string') or b''
+            if query:
+                request_size += len(query) + 1
+
             # Headers with proper separators (key: value\r\n)
-            for k, v in request.headers.items():
-                request_size += len(f"{k}: {v}\r\n")
+            for k, v in scope.get('headers') or ():
+                request_size += len(k) + len(v) + 4
             request_size += 2  # Final \r\n separator
-            
+
             # Body size
-            if 'content-length' in request.headers:
-                request_size += int(request.headers['content-length'])
-            elif hasattr(request, '_body') and request._body:
-                # Fallback: use actual body if available
-                request_size += len(request._body)
+            cl = request.headers.get('content-length')
+            if cl:
+                request_size += int(cl)
         except Exception:
             pass
 
-        # Detect test traffic early (header from live tests)
-        is_test = False
-        try:
-            is_test = (
-                str(
-                    request.headers.get('X-IS-TEST')
-                    or request.headers.get('X-Doorman-Test')
-                    or request.headers.get('X-Test-Request')
-                    or ''
-                ).lower()
-                in ('1', 'true', 'yes', 'on')
-            )
-        except Exception:
-            is_test = False
-
         # Process request
-        response = await call_next(request)
-
-        # Calculate duration
-        duration_ms = (time.time() - start_time) * 1000
-
-        # Extract response metadata
-        status_code = response.status_code
+        status_code = 500
+        response_headers = Headers()
+        body_sent = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_headers, body_sent
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                response_headers = Headers(raw=message.get('headers') or [])
+            elif message['type'] == 'http.response.body':
+                body_sent += len(message.get('body') or b'')
+            await send(message)
 
+        try:
+            await call_next(scope, receive, send_wrapper)
+        finally:
+            try:
+                request_accounting.submit(
+                    self._build_record(
+                        request,
+                        method,
+                        path,
+                        status_code,
+                        (time.time() - start_time) * 1000,
+                        request_size,
+                        response_headers,
+                        body_sent,
+                    )
+                )
+            except Exception as e:
+                logger.error(f'Failed to record analytics: {str(e)}')
+
+    def _build_record(
+        self,
+        request,
+        method: str,
+        path: str,
+        status_code: int,
+        duration_ms: float,
+        request_size: int,
+        response_headers: Headers,
+        body_sent: int,
+    ) -> RequestRecord:
         # Estimate response size (headers + body + protocol overhead)
         response_size = 0
         try:
             # Status line: "HTTP/1.1 200 OK\r\n"
-            status_text = response.status_code
             try:
                 from http import HTTPStatus
-                status_text = f"{response.status_code} {HTTPStatus(response.status_code).phrase}"
+
+                status_text = f'{status_code} {HTTPStatus(status_code).phrase}'
             except Exception:
-                status_text = str(response.status_code)
-            response_size += len(f"HTTP/1.1 {status_text}\r\n")
-            
+                status_text = str(status_code)
+            response_size += len(f'HTTP/1.1 {status_text}\r\n')
+
             # Headers with proper separators (key: value\r\n)
-            for k, v in response.headers.items():
-                response_size += len(f"{k}: {v}\r\n")
+            for k, v in response_headers.raw:
+                response_size += len(k) + len(v) + 4
             response_size += 2  # Final \r\n separator
-            
-            # Body size
-            if 'content-length' in response.headers:
-                response_size += int(response.headers['content-length'])
-            # Note: For streaming/chunked responses without Content-Length,
-            # we can't accurately measure body size in middleware without wrapping.
-            # This is acceptable as most responses have Content-Length.
+
+            # Body size: declared length, then the explicit body length header
+            # set by response_util, then what was actually streamed
+            body_len = int(response_headers.get('content-length') or 0)
+            if not body_len:
+                body_len = int(response_headers.get('x-body-length') or 0)
+            response_size += body_len or body_sent
         except Exception:
             pass
 
-        # Extract user from request state (set by auth middleware)
+        # User from the auth context the route computed; never re-decode the JWT here
         username = None
+        user_doc = None
         try:
-            if hasattr(request.state, 'user'):
-                username = (
-                    request.state.user.get('sub') if isinstance(request.state.user, dict) else None
-                )
+            ctx = getattr(request.state, 'auth_context', None)
+            payload = getattr(ctx, 'payload', None)
+            if isinstance(payload, dict):
+                username = payload.get('sub')
+                if isinstance(getattr(ctx, 'user', None), dict):
+                    user_doc = ctx.user
+            if not username:
+                user = getattr(request.state, 'user', None)
+                if isinstance(user, dict):
+                    username = user.get('sub') or user.get('username')
         except Exception:
             pass
 
-        # Extract request_id for logging
-        request_id = getattr(request.state, 'request_id', None) or request.headers.get('X-Request-ID') or 'unknown'
-
-        # Parse API and endpoint from path
-        api_key, endpoint_uri = self._parse_api_endpoint(path)
-
-        # Record metrics only for API traffic; exclude platform endpoints
+        # Detect test traffic (header from live tests)
+        is_test = False
         try:
-            if path.startswith('/api/'):
-                # Skip analytics for test traffic to avoid polluting dashboards
-                if not is_test:
-                    enhanced_metrics_store.record(
-                        status=status_code,
-                        duration_ms=duration_ms,
-                        username=username,
-                        api_key=api_key,
-                        endpoint_uri=endpoint_uri,
-                        method=method,
-                        bytes_in=request_size,
-                        bytes_out=response_size,
-                    )
-                    # Maintain legacy monitor metrics (used by /platform/monitor/metrics)
-                    metrics_store.record(
-                        status=status_code,
-                        duration_ms=duration_ms,
-                        username=username,
-                        api_key=api_key,
-                        bytes_in=request_size,
-                        bytes_out=response_size,
-                        is_test=False,
-                    )
-                    observe_request(duration_ms, status_code)
-                else:
-                    # Still capture test count in legacy store to keep test-aware totals accurate
-                    metrics_store.record(
-                        status=status_code,
-                        duration_ms=duration_ms,
-                        username=username,
-                        api_key=api_key,
-                        bytes_in=request_size,
-                        bytes_out=response_size,
-                        is_test=True,
-                    )
-        except Exception as e:
-            logger.error(f'Failed to record analytics: {str(e)}')
+            is_test = str(
+                request.headers.get('X-IS-TEST')
+                or request.headers.get('X-Doorman-Test')
+                or request.headers.get('X-Test-Request')
+                or ''
+            ).lower() in ('1', 'true', 'yes', 'on')
+        except Exception:
+            is_test = False
 
-        return response
+        api_key, endpoint_uri = self._parse_api_endpoint(path)
+        return RequestRecord(
+            status=status_code,
+            duration_ms=duration_ms,
+            username=username,
+            api_key=api_key,
+            endpoint_uri=endpoint_uri,
+            method=method,
+            bytes_in=request_size,
+            bytes_out=response_size,
+            is_test=is_test,
+            user=user_doc,
+        )
 
     def _parse_api_endpoint(self, path: str) -> tuple[str | None, str | None]:
         """
@@ -225,13 +226,3 @@ class AnalyticsMiddleware(BaseHTTPMiddleware):
 
         except Exception:
             return None, path
-
-
-def setup_analytics_middleware(app):
-    """
-    Add analytics middleware to FastAPI app.
-
-    Should be called during app initialization.
-    """
-    app.add_middleware(AnalyticsMiddleware)
-    logger.info('Analytics middleware initialized')
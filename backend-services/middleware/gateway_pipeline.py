@@ -0,0 +1,141 @@
+"""
+Single pure-ASGI request pipeline.
+
+Cross-cutting request handling (IP policy, CORS, body limits, request ids,
+security headers, metrics, ...) runs as an ordered list of stages inside one
+ASGI middleware instead of a stack of BaseHTTPMiddleware layers. Stages work on
+scope/receive/send directly, and the stages that apply to a request are picked
+once from its path and method before any of them run.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable, Iterable
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CallNext = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+_REQUEST_KEY = 'doorman.request'
+
+
+class PipelineStage:
+    """One step of the gateway pipeline.
+
+    Subclasses implement ``__call__(scope, receive, send, call_next)`` and
+    either answer the request themselves or await ``call_next`` (optionally
+    with a wrapped receive/send). ``prefixes`` limits the stage to matching
+    paths (None means every path) and ``exclude`` skips matching paths;
+    override ``applies`` for checks that also depend on the method.
+    """
+
+    name = 'stage'
+    prefixes: tuple[str, ...] | None = None
+    exclude: tuple[str, ...] = ()
+
+    def applies(self, path: str, method: str) -> bool:
+        if self.prefixes is not None and not path.startswith(self.prefixes):
+            return False
+        return not (self.exclude and path.startswith(self.exclude))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send, call_next: CallNext):
+        await call_next(scope, receive, send)
+
+
+class FunctionStage(PipelineStage):
+    """Stage backed by ``async def fn(scope, receive, send, call_next)``."""
+
+    def __init__(
+        self,
+        fn: Callable[[Scope, Receive, Send, CallNext], Awaitable[None]],
+        name: str | None = None,
+        prefixes: tuple[str, ...] | None = None,
+        exclude: tuple[str, ...] = (),
+    ) -> None:
+        self.fn = fn
+        self.name = name or fn.__name__
+        self.prefixes = prefixes
+        self.exclude = exclude
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send, call_next: CallNext):
+        await self.fn(scope, receive, send, call_next)
+
+
+def pipeline_stage(
+    prefixes: tuple[str, ...] | None = None, exclude: tuple[str, ...] = (), name: str | None = None
+):
+    """Decorator turning an ``async def fn(scope, receive, send, call_next)`` into a stage."""
+
+    def _wrap(fn):
+        return FunctionStage(fn, name=name, prefixes=prefixes, exclude=exclude)
+
+    return _wrap
+
+
+class MiddlewareStage(PipelineStage):
+    """Runs a plain ASGI middleware class (e.g. GZipMiddleware) as a stage."""
+
+    def __init__(self, middleware_cls, name: str | None = None, **options) -> None:
+        self.middleware_cls = middleware_cls
+        self.options = options
+        self.name = name or middleware_cls.__name__
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send, call_next: CallNext):
+        await self.middleware_cls(call_next, **self.options)(scope, receive, send)
+
+
+class GatewayPipeline:
+    """ASGI middleware that runs the applicable stages in order, outermost first."""
+
+    def __init__(self, app: ASGIApp, stages: Iterable[PipelineStage] = ()) -> None:
+        self.app = app
+        self.stages = tuple(stages)
+        self._chains: dict[tuple[int, ...], ASGIApp] = {}
+
+    def plan(self, path: str, method: str) -> tuple[int, ...]:
+        """Indexes of the stages that apply to a request, in run order."""
+        return tuple(i for i, s in enumerate(self.stages) if s.applies(path, method))
+
+    def _chain(self, plan: tuple[int, ...]) -> ASGIApp:
+        chain = self._chains.get(plan)
+        if chain is None:
+            chain = self.app
+            for i in reversed(plan):
+                chain = _bind(self.stages[i], chain)
+            self._chains[plan] = chain
+        return chain
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        plan = self.plan(scope.get('path') or '', scope.get('method') or 'GET')
+        await self._chain(plan)(scope, receive, send)
+
+
+def _bind(stage: PipelineStage, call_next: ASGIApp) -> ASGIApp:
+    async def _run(scope: Scope, receive: Receive, send: Send) -> None:
+        await stage(scope, receive, send, call_next)
+
+    return _run
+
+
+def get_request(scope: Scope) -> Request:
+    """Shared Request view of the scope for stages (headers, state, client)."""
+    request = scope.get(_REQUEST_KEY)
+    if request is None:
+        request = scope[_REQUEST_KEY] = Request(scope)
+    return request
+
+
+def on_response_start(send: Send, hook: Callable[[Message, MutableHeaders], None]) -> Send:
+    """Wrap send so ``hook(message, headers)`` can edit the response start message."""
+
+    async def _send(message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            hook(message, MutableHeaders(scope=message))
+        await send(message)
+
+    return _send
@@ -9,29 +9,33 @@ Only active if ENABLE_LATENCY_INJECTION env var is set.
 import asyncio
 import logging
 import os
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+
+from middleware.gateway_pipeline import PipelineStage, get_request
 
 logger = logging.getLogger('doorman.gateway')
 
 
-class LatencyInjectionMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
+class LatencyInjectionMiddleware(PipelineStage):
+    name = 'latency_injection'
+
+    def __init__(self):
         self.enabled = os.getenv('ENABLE_LATENCY_INJECTION', 'false').lower() == 'true'
 
-    async def dispatch(self, request: Request, call_next):
-        if self.enabled:
-            latency_ms = request.headers.get('x-doorman-latency')
-            if latency_ms:
-                try:
-                    delay = int(latency_ms)
-                    # Cap at 5 seconds for safety
-                    delay = min(max(0, delay), 5000)
-                    if delay > 0:
-                        logger.warning(f'Injecting {delay}ms latency for {request.url.path}')
-                        await asyncio.sleep(delay / 1000.0)
-                except ValueError:
-                    pass
-        
-        return await call_next(request)
+    def applies(self, path: str, method: str) -> bool:
+        return self.enabled
+
+    async def __call__(self, scope, receive, send, call_next):
+        request = get_request(scope)
+        latency_ms = request.headers.get('x-doorman-latency')
+        if latency_ms:
+            try:
+                delay = int(latency_ms)
+                # Cap at 5 seconds for safety
+                delay = min(max(0, delay), 5000)
+                if delay > 0:
+                    logger.warning(f'Injecting {delay}ms latency for {request.url.path}')
+                    await asyncio.sleep(delay / 1000.0)
+            except ValueError:
+                pass
+
+        await call_next(scope, receive, send)
@@ -15,7 +15,7 @@ from starlette.types import ASGIApp
 
 from models.rate_limit_models import RateLimitRule, RuleType, TierLimits, TimeWindow
 from utils.quota_tracker import QuotaTracker, QuotaType, get_quota_tracker
-from utils.rate_limiter import RateLimiter, get_rate_limiter
+from utils.rate_limiter import LeasePolicy, RateLimiter, get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -85,18 +85,23 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             identifier = self._get_identifier(rule, user_id, api_name, endpoint_uri, ip_address)
 
             if identifier:
-                result = self.rate_limiter.check_rate_limit(rule, identifier)
+                result = await self.rate_limiter.check_rate_limit_async(rule, identifier)
 
                 if not result.allowed:
                     # Rate limit exceeded
                     return self._create_rate_limit_response(result, rule)
 
         # Check quotas if user identified
+        quota_leased = False
         if user_id:
             tier_limits = await self.get_user_tier_func(user_id)
 
             if tier_limits:
                 quota_result = await self._check_quotas(user_id, tier_limits)
+                # A leased monthly quota is counted when checked
+                quota_leased = bool(
+                    tier_limits.monthly_request_quota and LeasePolicy.from_tier(tier_limits)
+                )
 
                 if not quota_result.allowed:
                     return self._create_quota_exceeded_response(quota_result)
@@ -111,13 +116,15 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             identifier = self._get_identifier(rule, user_id, api_name, endpoint_uri, ip_address)
 
             if identifier:
-                usage = self.rate_limiter.get_current_usage(rule, identifier)
+                usage = await self.rate_limiter.get_current_usage_async(rule, identifier)
                 self._add_rate_limit_headers(response, usage.limit, usage.remaining, usage.reset_at)
 
         # Increment quota (async, don't block response)
-        if user_id:
+        if user_id and not quota_leased:
             try:
-                self.quota_tracker.increment_quota(user_id, QuotaType.REQUESTS, 1, 'month')
+                await self.quota_tracker.increment_quota_async(
+                    user_id, QuotaType.REQUESTS, 1, 'month'
+                )
             except Exception as e:
                 logger.error(f'Error incrementing quota: {e}')
 
@@ -350,22 +357,32 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         Returns:
             QuotaCheckResult
         """
+        lease_policy = LeasePolicy.from_tier(tier_limits)
+
+        async def check(limit: int, period: str):
+            if lease_policy:
+                return await self.quota_tracker.consume_leased_async(
+                    user_id, QuotaType.REQUESTS, limit, lease_policy, period
+                )
+            return await self.quota_tracker.check_quota_async(
+                user_id, QuotaType.REQUESTS, limit, period
+            )
+
         # Check monthly quota
         if tier_limits.monthly_request_quota:
-            result = self.quota_tracker.check_quota(
-                user_id, QuotaType.REQUESTS, tier_limits.monthly_request_quota, 'month'
-            )
+            result = await check(tier_limits.monthly_request_quota, 'month')
 
             if not result.allowed:
                 return result
 
         # Check daily quota
         if tier_limits.daily_request_quota:
-            result = self.quota_tracker.check_quota(
-                user_id, QuotaType.REQUESTS, tier_limits.daily_request_quota, 'day'
-            )
+            result = await check(tier_limits.daily_request_quota, 'day')
 
             if not result.allowed:
+                # A leased monthly unit was already taken for this request
+                if lease_policy and tier_limits.monthly_request_quota:
+                    self.quota_tracker.refund_leased(user_id, QuotaType.REQUESTS, 'month')
                 return result
 
         # All quotas OK
@@ -5,34 +5,22 @@ Enforces rate limiting and throttling based on user tier configuration.
 Works alongside existing per-user rate limiting.
 """
 
-import asyncio
 import logging
 import time
 
-from fastapi import Request, Response
+from fastapi import Request
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.datastructures import MutableHeaders
 
+from middleware.gateway_pipeline import PipelineStage, get_request
 from models.rate_limit_models import TierLimits
 from services.tier_service import get_tier_service
 from utils.database_async import async_database
 
-try:
-    from utils.auth_util import SECRET_KEY, ALGORITHM
-except Exception:
-    SECRET_KEY = None
-    ALGORITHM = 'HS256'
-
-try:
-    from jose import jwt as _jwt
-except Exception:
-    _jwt = None
-
 logger = logging.getLogger('doorman.gateway')
 
 
-class TierRateLimitMiddleware(BaseHTTPMiddleware):
+class TierRateLimitMiddleware(PipelineStage):
     """
     Middleware for tier-based rate limiting and throttling
 
@@ -43,28 +31,39 @@ class TierRateLimitMiddleware(BaseHTTPMiddleware):
     - Adds rate limit headers to responses
     """
 
+    name = 'tier_rate_limit'
+    # Admin interface and infra endpoints are skipped for user-tier limits
+    exclude = ('/health', '/metrics', '/docs', '/redoc', '/openapi.json', '/platform/')
+
     # Class-level helper for usage in tests
     _rate_limiter_override = None
 
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
+    def __init__(self):
         # Use simple local queue for throttling, but rate limiting itself is distributed via Redis
         self._request_queue = {}
 
-    async def dispatch(self, request: Request, call_next):
+    def applies(self, path: str, method: str) -> bool:
+        """Check if request should go through rate limiting"""
+        import os
+
+        # Skip tier rate limiting when explicitly disabled
+        if os.getenv('SKIP_TIER_RATE_LIMIT', '').lower() in ('1', 'true', 'yes'):
+            return False
+        return super().applies(path, method)
+
+    async def __call__(self, scope, receive, send, call_next):
         """
         Process request through tier-based rate limiting
         """
-        # Skip rate limiting for certain paths
-        if self._should_skip(request):
-            return await call_next(request)
+        request = get_request(scope)
+        logger.info(f'[tier_rl] checking path={request.url.path}')
 
         # Extract user ID
-        user_id = self._get_user_id(request)
+        user_id = await self._get_user_id(request)
         logger.info(f'[tier_rl] user_id={user_id} path={request.url.path}')
 
         if not user_id:
-            return await call_next(request)
+            return await call_next(scope, receive, send)
 
         # Get user's tier limits
         try:
@@ -72,11 +71,11 @@ class TierRateLimitMiddleware(BaseHTTPMiddleware):
             limits = await tier_service.get_user_limits(user_id)
         except Exception as e:
             logger.error(f'[tier_rl] Error getting limits for {user_id}: {str(e)}', exc_info=True)
-            return await call_next(request)
-        
+            return await call_next(scope, receive, send)
+
         if not limits:
             logger.info(f'[tier_rl] no limits found for user_id={user_id}')
-            return await call_next(request)
+            return await call_next(scope, receive, send)
         
         logger.info(f'[tier_rl] applying limits for {user_id}: minute={limits.requests_per_minute}')
 
@@ -84,60 +83,56 @@ class TierRateLimitMiddleware(BaseHTTPMiddleware):
         from utils.rate_limiter import get_rate_limiter
         rate_limiter = self._rate_limiter_override or get_rate_limiter()
         
-        # Check all applicable windows
+        # Check all applicable windows (smallest first) in one atomic call
         from models.rate_limit_models import RateLimitRule, RuleType, TimeWindow
-        
-        # Minute check
-        minute_res = None
-        if limits.requests_per_minute and limits.requests_per_minute < 999999:
-            rule = RateLimitRule(
-                rule_id=f'tier_minute_{user_id}',
-                rule_type=RuleType.PER_USER,
-                time_window=TimeWindow.MINUTE,
-                limit=limits.requests_per_minute,
-                burst_allowance=limits.burst_per_minute,
-            )
-            # Use check_hybrid for token bucket burst support + sliding window accuracy
-            minute_res = await asyncio.to_thread(rate_limiter.check_hybrid, rule, user_id)
-            if not minute_res.allowed:
-                return self._handle_limit_exceeded(minute_res, limits, 'minute')
-
-        # Hour check
-        hour_res = None
-        if limits.requests_per_hour and limits.requests_per_hour < 999999:
-            rule = RateLimitRule(
-                rule_id=f'tier_hour_{user_id}',
-                rule_type=RuleType.PER_USER,
-                time_window=TimeWindow.HOUR,
-                limit=limits.requests_per_hour,
-                burst_allowance=limits.burst_per_hour,
-            )
-            hour_res = await asyncio.to_thread(rate_limiter.check_hybrid, rule, user_id)
-            if not hour_res.allowed:
-                return self._handle_limit_exceeded(hour_res, limits, 'hour')
-
-        # Day check
-        day_res = None
-        if limits.requests_per_day and limits.requests_per_day < 999999:
-            rule = RateLimitRule(
-                rule_id=f'tier_day_{user_id}',
-                rule_type=RuleType.PER_USER,
-                time_window=TimeWindow.DAY,
-                limit=limits.requests_per_day,
+
+        windows = (
+            ('minute', TimeWindow.MINUTE, limits.requests_per_minute, limits.burst_per_minute),
+            ('hour', TimeWindow.HOUR, limits.requests_per_hour, limits.burst_per_hour),
+            ('day', TimeWindow.DAY, limits.requests_per_day, 0),
+        )
+        periods, rules = [], []
+        for period, time_window, limit, burst in windows:
+            if limit and limit < 999999:
+                periods.append(period)
+                rules.append(
+                    RateLimitRule(
+                        rule_id=f'tier_{period}_{user_id}',
+                        rule_type=RuleType.PER_USER,
+                        time_window=time_window,
+                        limit=limit,
+                        burst_allowance=burst or 0,
+                    )
+                )
+
+        # Hybrid semantics per window: token bucket burst support + sliding window accuracy.
+        # Tiers with leasing serve hot users from locally reserved slices instead.
+        from utils.rate_limiter import LeasePolicy
+
+        lease_policy = LeasePolicy.from_tier(limits)
+        if not rules:
+            results = []
+        elif lease_policy:
+            results = await rate_limiter.check_leased_async(rules, user_id, lease_policy)
+        else:
+            results = await rate_limiter.check_windows_async(rules, user_id)
+        if results and not results[-1].allowed:
+            response = self._handle_limit_exceeded(
+                results[-1], limits, periods[len(results) - 1]
             )
-            day_res = await asyncio.to_thread(rate_limiter.check_hybrid, rule, user_id)
-            if not day_res.allowed:
-                return self._handle_limit_exceeded(day_res, limits, 'day')
+            return await response(scope, receive, send)
 
-        # Allowed. Proceed.
-        response = await call_next(request)
+        # Allowed. Proceed, adding headers (prioritize smallest window)
+        if not results:
+            return await call_next(scope, receive, send)
+        res_to_use = results[0]
 
-        # Add headers (prioritize smallest window)
-        res_to_use = minute_res or hour_res or day_res
-        if res_to_use:
-            self._add_rate_limit_headers(response, res_to_use)
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                self._add_rate_limit_headers(MutableHeaders(scope=message), res_to_use)
+            await send(message)
 
-        return response
+        await call_next(scope, receive, send_wrapper)
 
     def _handle_limit_exceeded(self, result, limits: TierLimits, period: str):
         """Handle rejection or throttling"""
@@ -167,77 +162,32 @@ class TierRateLimitMiddleware(BaseHTTPMiddleware):
             headers=headers,
         )
 
-    def _add_rate_limit_headers(self, response: Response, result):
+    def _add_rate_limit_headers(self, headers: MutableHeaders, result):
         """Add X-RateLimit-* headers"""
         try:
             info = result.to_info()
             for key, val in info.to_headers().items():
-                response.headers[key] = val
+                headers[key] = val
         except Exception:
             pass
 
-    def _should_skip(self, request: Request) -> bool:
-        """Check if request should skip rate limiting"""
-        import os
+    async def _get_user_id(self, request: Request) -> str | None:
+        """Extract user ID, building the shared per-request AuthContext.
 
-        # Skip tier rate limiting when explicitly disabled
-        if os.getenv('SKIP_TIER_RATE_LIMIT', '').lower() in ('1', 'true', 'yes'):
-            return True
-
-        if request.url.path.startswith('/health') or \
-           request.url.path.startswith('/metrics') or \
-           request.url.path.startswith('/docs') or \
-           request.url.path.startswith('/redoc') or \
-           request.url.path.startswith('/openapi.json'):
-            return True
-            
-        # Admin interface usually skipped for user-tier limits
-        if request.url.path.startswith('/platform/'):
-            return True
-
-        logger.info(f'[tier_rl] checking path={request.url.path}')
-        return False
-
-    def _get_user_id(self, request: Request) -> str | None:
-        """Extract user ID with support for previously decoded state"""
-        # 1) Previously decoded payload
+        The context is stored on request.state so the gateway guards that run
+        after this middleware reuse the verified claims instead of decoding the
+        JWT again.
+        """
         try:
             if hasattr(request.state, 'jwt_payload') and request.state.jwt_payload:
-                 return request.state.jwt_payload.get('sub')
+                return request.state.jwt_payload.get('sub')
         except Exception:
             pass
 
-        # 2) Cookie/Header decode logic duplicate from auth_util handled by earlier middleware usually,
-        # but re-implemented here for safety if middleware order varies.
+        from utils.auth_util import auth_required
+
         try:
-            from utils.auth_util import auth_required
-            # We don't call auth_required because it raises 401. We just want to peek.
-            # Reuse existing methods if possible or simplified peek:
-            pass 
+            payload = await auth_required(request)
+            return payload.get('sub')
         except Exception:
-            pass
-            
-        # Fallback to existing logic if needed, but for now assuming auth middleware ran first
-        # or we accept checking cookies directly
-        import os
-        token = request.cookies.get('access_token_cookie')
-        if not token:
-            auth = request.headers.get('Authorization') or request.headers.get('authorization')
-            if auth and str(auth).lower().startswith('bearer '):
-                token = auth.split(' ', 1)[1].strip()
-        
-        if token and _jwt:
-            # Read secret from key_util now
-            from utils.key_util import get_verification_key
-            try:
-                # Unverified decode to find kid
-                header = _jwt.get_unverified_header(token)
-                kid = header.get('kid')
-                key_info = get_verification_key(kid)
-                if key_info:
-                    payload = _jwt.decode(token, key_info.verification_key, algorithms=[key_info.algorithm])
-                    return payload.get('sub')
-            except Exception:
-                pass
-                
-        return None
+            return None
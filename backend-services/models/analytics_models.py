@@ -7,7 +7,12 @@ analytics capabilities while maintaining backward compatibility.
 
 from __future__ import annotations
 
+import base64
+import hashlib
+import math
+from array import array
 from collections import deque
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -38,7 +43,7 @@ class PercentileMetrics:
     Latency percentile calculations.
 
     Stores multiple percentiles for comprehensive performance analysis.
-    Uses a reservoir sampling approach to maintain a representative sample.
+    Usually derived from a LatencySketch.
     """
 
     p50: float = 0.0  # Median
@@ -84,6 +89,385 @@ class PercentileMetrics:
         }
 
 
+@dataclass(eq=False)
+class LatencySketch:
+    """
+    Mergeable latency quantile sketch (DDSketch-style log buckets).
+
+    A value v is counted in bucket ceil(log_gamma(v)), so every quantile is
+    reported within relative_accuracy of the true value. Counts are kept in a
+    dense array starting at bucket `offset`; two sketches merge exactly by
+    adding counts, which keeps minute -> 5-minute -> hourly -> daily rollups
+    lossless. The array is capped at max_buckets by folding the lowest buckets
+    together, so only the smallest latencies lose precision.
+    """
+
+    relative_accuracy: float = 0.01
+    max_buckets: int = 2048
+    offset: int = 0
+    counts: array = field(default_factory=lambda: array('I'))
+    zero_count: int = 0
+    count: int = 0
+    min: float = 0.0
+    max: float = 0.0
+
+    # Values at or below this are counted as zero latency
+    MIN_INDEXABLE = 1e-6
+
+    def __post_init__(self) -> None:
+        gamma = (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+        self._gamma = gamma
+        self._log_gamma = math.log(gamma)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, LatencySketch):
+            return NotImplemented
+        return (
+            self._gamma == other._gamma
+            and self.bins == other.bins
+            and (self.zero_count, self.count, self.min, self.max)
+            == (other.zero_count, other.count, other.min, other.max)
+        )
+
+    @property
+    def bins(self) -> dict[int, int]:
+        """Non-empty buckets as {bucket index: count}."""
+        return {self.offset + i: n for i, n in enumerate(self.counts) if n}
+
+    def _reserve(self, lo: int, hi: int) -> None:
+        counts = self.counts
+        if not counts:
+            self.offset = lo
+            counts.extend(array(counts.typecode, [0]) * (hi - lo + 1))
+            return
+        if lo < self.offset:
+            counts[:0] = array(counts.typecode, [0]) * (self.offset - lo)
+            self.offset = lo
+        top = self.offset + len(counts) - 1
+        if hi > top:
+            counts.extend(array(counts.typecode, [0]) * (hi - top))
+
+    def _bump(self, pos: int, n: int) -> None:
+        try:
+            self.counts[pos] += n
+        except OverflowError:
+            self.counts = array('Q', self.counts)
+            self.counts[pos] += n
+
+    def _collapse(self) -> None:
+        excess = len(self.counts) - self.max_buckets
+        if excess <= 0:
+            return
+        folded = sum(self.counts[: excess + 1])
+        del self.counts[:excess]
+        self.offset += excess
+        self.counts[0] = 0
+        self._bump(0, folded)
+
+    def _track(self, value: float, n: int) -> None:
+        if self.count == 0:
+            self.min = self.max = value
+        elif value < self.min:
+            self.min = value
+        elif value > self.max:
+            self.max = value
+        self.count += n
+
+    def add(self, value: float, n: int = 1) -> None:
+        """Record value (in ms) n times."""
+        value = float(value)
+        if value <= self.MIN_INDEXABLE:
+            self.zero_count += n
+        else:
+            idx = math.ceil(math.log(value) / self._log_gamma)
+            self._reserve(idx, idx)
+            self._bump(idx - self.offset, n)
+            if len(self.counts) > self.max_buckets:
+                self._collapse()
+        self._track(value, n)
+
+    def merge(self, other: LatencySketch) -> LatencySketch:
+        """Add other's counts into this sketch (in place) and return it."""
+        if not other.count:
+            return self
+        if other._gamma != self._gamma:
+            # Different resolutions: re-bin at each bucket's representative value
+            for idx, n in other.bins.items():
+                self.add(other._value(idx), n)
+            if other.zero_count:
+                self.add(0.0, other.zero_count)
+            return self
+        if other.counts:
+            self._reserve(other.offset, other.offset + len(other.counts) - 1)
+            base = other.offset - self.offset
+            for i, n in enumerate(other.counts):
+                if n:
+                    self._bump(base + i, n)
+            self._collapse()
+        self.zero_count += other.zero_count
+        if self.count == 0:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        return self
+
+    @staticmethod
+    def merge_all(sketches: Iterable[LatencySketch | None]) -> LatencySketch:
+        """Merge sketches into a new one; None entries are skipped."""
+        merged = LatencySketch()
+        for sketch in sketches:
+            if sketch is not None:
+                merged.merge(sketch)
+        return merged
+
+    def _value(self, idx: int) -> float:
+        return 2 * self._gamma**idx / (self._gamma + 1)
+
+    def quantiles(self, qs: Iterable[float]) -> list[float]:
+        """Values at each quantile in qs, in one pass over the buckets."""
+        qs = list(qs)
+        out = [0.0] * len(qs)
+        if not self.count:
+            return out
+        # Same rank convention as PercentileMetrics.calculate
+        ranks = sorted((max(0, int(q * self.count) - 1), i) for i, q in enumerate(qs))
+        j = 0
+        seen = self.zero_count
+        while j < len(ranks) and ranks[j][0] < seen:
+            out[ranks[j][1]] = self.min
+            j += 1
+        for pos, n in enumerate(self.counts):
+            if j == len(ranks):
+                break
+            if not n:
+                continue
+            seen += n
+            value = min(self.max, max(self.min, self._value(self.offset + pos)))
+            while j < len(ranks) and ranks[j][0] < seen:
+                out[ranks[j][1]] = value
+                j += 1
+        for _, i in ranks[j:]:
+            out[i] = self.max
+        return out
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles([q])[0]
+
+    def percentiles(self) -> PercentileMetrics:
+        if not self.count:
+            return PercentileMetrics()
+        p50, p75, p90, p95, p99 = self.quantiles((0.50, 0.75, 0.90, 0.95, 0.99))
+        return PercentileMetrics(
+            p50=p50, p75=p75, p90=p90, p95=p95, p99=p99, min=self.min, max=self.max
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'count': self.count,
+            'zero_count': self.zero_count,
+            'min': self.min,
+            'max': self.max,
+            'offset': self.offset,
+            'counts': self.counts.tolist(),
+        }
+
+    @staticmethod
+    def from_dict(d: dict | None) -> LatencySketch:
+        d = d or {}
+        sketch = LatencySketch(relative_accuracy=float(d.get('relative_accuracy', 0.01)))
+        counts = [int(n) for n in d.get('counts') or []]
+        try:
+            sketch.counts = array('I', counts)
+        except OverflowError:
+            sketch.counts = array('Q', counts)
+        sketch.offset = int(d.get('offset', 0))
+        sketch.zero_count = int(d.get('zero_count', 0))
+        sketch.count = int(d.get('count', 0))
+        sketch.min = float(d.get('min', 0.0))
+        sketch.max = float(d.get('max', 0.0))
+        return sketch
+
+
+@dataclass(eq=False)
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter (unique users, unique IPs).
+
+    Members are hashed with blake2b so sketches built by different workers
+    agree and merge by taking the register-wise maximum. Small sets are kept
+    as exact hashes and switch to 2**precision one-byte registers (about
+    1.6% standard error at the default precision) once they outgrow them.
+    """
+
+    precision: int = 12
+    registers: bytearray | None = None
+    hashes: set[int] = field(default_factory=set)
+
+    # Exact hashes kept before switching to registers
+    SPARSE_LIMIT = 64
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, HyperLogLog):
+            return NotImplemented
+        return (self.precision, self.registers, self.hashes) == (
+            other.precision,
+            other.registers,
+            other.hashes,
+        )
+
+    @staticmethod
+    def _hash(member: str) -> int:
+        digest = hashlib.blake2b(str(member).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def _fold(self, h: int) -> None:
+        p = self.precision
+        idx = h >> (64 - p)
+        rank = (64 - p) - (h & ((1 << (64 - p)) - 1)).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def _densify(self) -> None:
+        if self.registers is None:
+            self.registers = bytearray(1 << self.precision)
+            for h in self.hashes:
+                self._fold(h)
+            self.hashes = set()
+
+    def add(self, member: str) -> None:
+        h = self._hash(member)
+        if self.registers is None:
+            self.hashes.add(h)
+            if len(self.hashes) > self.SPARSE_LIMIT:
+                self._densify()
+        else:
+            self._fold(h)
+
+    def merge(self, other: HyperLogLog) -> HyperLogLog:
+        """Fold other into this sketch (in place) and return it."""
+        if other.precision != self.precision:
+            raise ValueError('Cannot merge HyperLogLog sketches of different precision')
+        if other.registers is None:
+            if self.registers is None:
+                self.hashes |= other.hashes
+                if len(self.hashes) > self.SPARSE_LIMIT:
+                    self._densify()
+            else:
+                for h in other.hashes:
+                    self._fold(h)
+            return self
+        self._densify()
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    @staticmethod
+    def merge_all(sketches: Iterable[HyperLogLog | None]) -> HyperLogLog:
+        """Merge sketches into a new one; None entries are skipped."""
+        merged = HyperLogLog()
+        for sketch in sketches:
+            if sketch is not None:
+                merged.merge(sketch)
+        return merged
+
+    def count(self) -> int:
+        """Estimated number of distinct members (exact while sparse)."""
+        if self.registers is None:
+            return len(self.hashes)
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self) -> dict:
+        if self.registers is None:
+            return {'precision': self.precision, 'hashes': sorted(self.hashes)}
+        return {
+            'precision': self.precision,
+            'registers': base64.b64encode(bytes(self.registers)).decode('ascii'),
+        }
+
+    @staticmethod
+    def from_dict(d: dict | None) -> HyperLogLog:
+        d = d or {}
+        hll = HyperLogLog(precision=int(d.get('precision', 12)))
+        if d.get('registers'):
+            hll.registers = bytearray(base64.b64decode(d['registers']))
+        else:
+            hll.hashes = {int(h) for h in d.get('hashes') or []}
+        return hll
+
+    @staticmethod
+    def of(members: Iterable[str]) -> HyperLogLog:
+        hll = HyperLogLog()
+        for member in members:
+            hll.add(member)
+        return hll
+
+
+@dataclass
+class HeavyHitters:
+    """
+    Bounded per-key counts for top-N lists (Space-Saving).
+
+    Holds at most `capacity` keys. A new key arriving at a full table replaces
+    the smallest entry and inherits its count, so any key seen more than
+    total/capacity times is guaranteed to be present, with a count that is
+    exact while the table is below capacity and an upper bound after that.
+    """
+
+    capacity: int = 100
+    counts: dict[str, int] = field(default_factory=dict)
+
+    def add(self, key: str, n: int = 1) -> None:
+        counts = self.counts
+        if key in counts:
+            counts[key] += n
+        elif len(counts) < self.capacity:
+            counts[key] = n
+        else:
+            smallest = min(counts, key=counts.get)
+            counts[key] = counts.pop(smallest) + n
+
+    def merge(self, other: HeavyHitters) -> HeavyHitters:
+        """Add other's counts and keep the largest `capacity` entries."""
+        for key, n in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+        if len(self.counts) > self.capacity:
+            self.counts = dict(self.top(self.capacity))
+        return self
+
+    def top(self, limit: int = 10) -> list[tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+
+    def items(self):
+        return self.counts.items()
+
+    def keys(self):
+        return self.counts.keys()
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __bool__(self) -> bool:
+        return bool(self.counts)
+
+    @staticmethod
+    def from_counts(counts: dict | None, capacity: int = 100) -> HeavyHitters:
+        hh = HeavyHitters(capacity=capacity)
+        for key, n in (counts or {}).items():
+            hh.counts[str(key)] = int(n)
+        if len(hh.counts) > capacity:
+            hh.counts = dict(hh.top(capacity))
+        return hh
+
+
 @dataclass
 class EndpointMetrics:
     """
@@ -98,10 +482,10 @@ class EndpointMetrics:
     count: int = 0
     error_count: int = 0
     total_ms: float = 0.0
-    latencies: deque[float] = field(default_factory=deque)
+    latency_sketch: LatencySketch = field(default_factory=LatencySketch)
     status_counts: dict[int, int] = field(default_factory=dict)
 
-    def add(self, ms: float, status: int, max_samples: int = 500) -> None:
+    def add(self, ms: float, status: int) -> None:
         """Record a request for this endpoint."""
         self.count += 1
         if status >= 400:
@@ -110,13 +494,21 @@ class EndpointMetrics:
 
         self.status_counts[status] = self.status_counts.get(status, 0) + 1
 
-        self.latencies.append(ms)
-        while len(self.latencies) > max_samples:
-            self.latencies.popleft()
+        self.latency_sketch.add(ms)
+
+    def merge(self, other: EndpointMetrics) -> EndpointMetrics:
+        """Add other's counts into this endpoint (in place) and return it."""
+        self.count += other.count
+        self.error_count += other.error_count
+        self.total_ms += other.total_ms
+        for status, n in other.status_counts.items():
+            self.status_counts[status] = self.status_counts.get(status, 0) + n
+        self.latency_sketch.merge(other.latency_sketch)
+        return self
 
     def get_percentiles(self) -> PercentileMetrics:
         """Calculate percentiles for this endpoint."""
-        return PercentileMetrics.calculate(list(self.latencies))
+        return self.latency_sketch.percentiles()
 
     def to_dict(self) -> dict:
         percentiles = self.get_percentiles()
@@ -129,6 +521,7 @@ class EndpointMetrics:
             'avg_ms': (self.total_ms / self.count) if self.count > 0 else 0.0,
             'percentiles': percentiles.to_dict(),
             'status_counts': dict(self.status_counts),
+            'latency_sketch': self.latency_sketch.to_dict(),
         }
 
     @staticmethod
@@ -142,8 +535,8 @@ class EndpointMetrics:
             total_ms=float(d.get('avg_ms', 0.0)) * int(d.get('count', 0)),
         )
         em.status_counts = {int(k): int(v) for k, v in (d.get('status_counts') or {}).items()}
-        # Note: We don't persist full latency list for endpoints to save space, 
-        # so we accept starting with empty latencies. New requests will populate it.
+        # Data saved before sketches existed has no latencies; new requests populate it
+        em.latency_sketch = LatencySketch.from_dict(d.get('latency_sketch'))
         return em
 
 
@@ -172,12 +565,13 @@ class EnhancedMinuteBucket:
     status_counts: dict[int, int] = field(default_factory=dict)
     api_counts: dict[str, int] = field(default_factory=dict)
     api_error_counts: dict[str, int] = field(default_factory=dict)
-    user_counts: dict[str, int] = field(default_factory=dict)
-    latencies: deque[float] = field(default_factory=deque)
+    # Top users only; the unique count comes from unique_users_sketch
+    user_counts: HeavyHitters = field(default_factory=HeavyHitters)
+    latency_sketch: LatencySketch = field(default_factory=LatencySketch)
 
     # NEW: Enhanced tracking
     endpoint_metrics: dict[str, EndpointMetrics] = field(default_factory=dict)
-    unique_users: set = field(default_factory=set)
+    unique_users_sketch: HyperLogLog = field(default_factory=HyperLogLog)
     request_sizes: deque[int] = field(default_factory=deque)
     response_sizes: deque[int] = field(default_factory=deque)
 
@@ -214,12 +608,10 @@ class EnhancedMinuteBucket:
                 self.api_error_counts[api_key] = self.api_error_counts.get(api_key, 0) + 1
 
         if username:
-            self.user_counts[username] = self.user_counts.get(username, 0) + 1
-            self.unique_users.add(username)
+            self.user_counts.add(username)
+            self.unique_users_sketch.add(username)
 
-        self.latencies.append(ms)
-        while len(self.latencies) > max_samples:
-            self.latencies.popleft()
+        self.latency_sketch.add(ms)
 
         # NEW: Per-endpoint tracking
         if endpoint_uri and method:
@@ -228,7 +620,7 @@ class EnhancedMinuteBucket:
                 self.endpoint_metrics[endpoint_key] = EndpointMetrics(
                     endpoint_uri=endpoint_uri, method=method
                 )
-            self.endpoint_metrics[endpoint_key].add(ms, status, max_samples)
+            self.endpoint_metrics[endpoint_key].add(ms, status)
 
         # NEW: Request/response size tracking
         if bytes_in > 0:
@@ -241,13 +633,45 @@ class EnhancedMinuteBucket:
             while len(self.response_sizes) > max_samples:
                 self.response_sizes.popleft()
 
+    def merge(self, other: EnhancedMinuteBucket) -> EnhancedMinuteBucket:
+        """
+        Add another bucket for the same minute (e.g. from another worker).
+
+        Counters and sketches merge exactly; raw request/response size samples
+        are not carried over.
+        """
+        self.count += other.count
+        self.error_count += other.error_count
+        self.total_ms += other.total_ms
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.upstream_timeouts += other.upstream_timeouts
+        self.retries += other.retries
+        for mine, theirs in (
+            (self.status_counts, other.status_counts),
+            (self.api_counts, other.api_counts),
+            (self.api_error_counts, other.api_error_counts),
+        ):
+            for k, n in theirs.items():
+                mine[k] = mine.get(k, 0) + n
+        self.user_counts.merge(other.user_counts)
+        self.latency_sketch.merge(other.latency_sketch)
+        self.unique_users_sketch.merge(other.unique_users_sketch)
+        for key, ep in other.endpoint_metrics.items():
+            if key not in self.endpoint_metrics:
+                self.endpoint_metrics[key] = EndpointMetrics(
+                    endpoint_uri=ep.endpoint_uri, method=ep.method
+                )
+            self.endpoint_metrics[key].merge(ep)
+        return self
+
     def get_percentiles(self) -> PercentileMetrics:
         """Calculate full percentiles for this bucket."""
-        return PercentileMetrics.calculate(list(self.latencies))
+        return self.latency_sketch.percentiles()
 
     def get_unique_user_count(self) -> int:
         """Get count of unique users in this bucket."""
-        return len(self.unique_users)
+        return self.unique_users_sketch.count()
 
     def get_top_endpoints(self, limit: int = 10) -> list[dict]:
         """Get top N slowest/most-used endpoints."""
@@ -273,12 +697,12 @@ class EnhancedMinuteBucket:
             'status_counts': dict(self.status_counts),
             'api_counts': dict(self.api_counts),
             'api_error_counts': dict(self.api_error_counts),
-            'user_counts': dict(self.user_counts),
+            'user_counts': dict(self.user_counts.counts),
             # NEW: Enhanced fields
             'percentiles': percentiles.to_dict(),
+            'latency_sketch': self.latency_sketch.to_dict(),
             'unique_users': self.get_unique_user_count(),
-            # Persist unique users as list
-            'unique_users_list': list(self.unique_users),
+            'unique_users_sketch': self.unique_users_sketch.to_dict(),
             'endpoint_metrics': {k: v.to_dict() for k, v in self.endpoint_metrics.items()},
             'avg_response_size': sum(self.response_sizes) / len(self.response_sizes)
             if self.response_sizes
@@ -302,7 +726,8 @@ class EnhancedMinuteBucket:
         mb.status_counts = {int(k): int(v) for k, v in (d.get('status_counts') or {}).items()}
         mb.api_counts = dict(d.get('api_counts') or {})
         mb.api_error_counts = dict(d.get('api_error_counts') or {})
-        mb.user_counts = dict(d.get('user_counts') or {})
+        mb.user_counts = HeavyHitters.from_counts(d.get('user_counts'))
+        mb.latency_sketch = LatencySketch.from_dict(d.get('latency_sketch'))
         
         # Restore endpoint metrics
         ep_data = d.get('endpoint_metrics') or {}
@@ -312,12 +737,14 @@ class EnhancedMinuteBucket:
             except Exception:
                 pass
                 
-        # Restore unique users set
-        if 'unique_users_list' in d:
-            mb.unique_users = set(d['unique_users_list'])
+        # Restore unique users (older data stored the full list)
+        if d.get('unique_users_sketch'):
+            mb.unique_users_sketch = HyperLogLog.from_dict(d['unique_users_sketch'])
+        elif 'unique_users_list' in d:
+            mb.unique_users_sketch = HyperLogLog.of(d['unique_users_list'])
         elif 'user_counts' in d:
             # Fallback for old data
-            mb.unique_users = set(d['user_counts'].keys())
+            mb.unique_users_sketch = HyperLogLog.of(d['user_counts'].keys())
         
         return mb
 
@@ -344,9 +771,17 @@ class AggregatedMetrics:
     status_counts: dict[int, int] = field(default_factory=dict)
     api_counts: dict[str, int] = field(default_factory=dict)
     percentiles: PercentileMetrics | None = None
+    # Merged latency sketch; percentiles are derived from it
+    latency_sketch: LatencySketch | None = None
     
-    # Store set for merging (not always persisted)
-    unique_users_set: set = field(default_factory=set)
+    # Mergeable unique-user sketch and bounded top users
+    unique_users_sketch: HyperLogLog | None = None
+    user_counts: HeavyHitters = field(default_factory=HeavyHitters)
+
+    def get_percentiles(self) -> PercentileMetrics:
+        if self.latency_sketch is not None:
+            return self.latency_sketch.percentiles()
+        return self.percentiles or PercentileMetrics()
 
     def to_dict(self) -> dict:
         return {
@@ -363,8 +798,11 @@ class AggregatedMetrics:
             'status_counts': dict(self.status_counts),
             'api_counts': dict(self.api_counts),
             'percentiles': self.percentiles.to_dict() if self.percentiles else None,
-            # Persist unique users set as list
-            'unique_users_list': list(self.unique_users_set) if self.unique_users_set else [],
+            'latency_sketch': self.latency_sketch.to_dict() if self.latency_sketch else None,
+            'unique_users_sketch': self.unique_users_sketch.to_dict()
+            if self.unique_users_sketch
+            else None,
+            'user_counts': dict(self.user_counts.counts),
         }
 
     @staticmethod
@@ -396,10 +834,16 @@ class AggregatedMetrics:
                 min=float(p.get('min', 0)),
                 max=float(p.get('max', 0)),
             )
+        if d.get('latency_sketch'):
+            am.latency_sketch = LatencySketch.from_dict(d['latency_sketch'])
+
+        am.user_counts = HeavyHitters.from_counts(d.get('user_counts'))
 
-        # Restore unique users set
-        if 'unique_users_list' in d:
-            am.unique_users_set = set(d['unique_users_list'])
+        # Restore unique users (older data stored the full list)
+        if d.get('unique_users_sketch'):
+            am.unique_users_sketch = HyperLogLog.from_dict(d['unique_users_sketch'])
+        elif d.get('unique_users_list'):
+            am.unique_users_sketch = HyperLogLog.of(d['unique_users_list'])
             
         return am
 
@@ -174,6 +174,11 @@ class TierLimits:
     enable_throttling: bool = False  # If true, queue/delay requests; if false, hard reject (429)
     max_queue_time_ms: int = 5000  # Maximum time to queue a request before rejecting (milliseconds)
 
+    # Token leasing for hot users: each worker reserves a slice of the shared
+    # budget and admits from it locally (0 = every request goes to Redis)
+    lease_fraction: float = 0.0  # Lease size as a share of the limit (e.g. 0.05)
+    lease_max_tokens: int | None = None  # Error bound: most tokens one worker may hold
+
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary"""
         return {
@@ -190,6 +195,8 @@ class TierLimits:
             'monthly_bandwidth_quota': self.monthly_bandwidth_quota,
             'enable_throttling': self.enable_throttling,
             'max_queue_time_ms': self.max_queue_time_ms,
+            'lease_fraction': self.lease_fraction,
+            'lease_max_tokens': self.lease_max_tokens,
         }
 
     @classmethod
@@ -4,7 +4,6 @@ Review the Apache License 2.0 for valid authorization of use
 See https://github.com/pypeople-dev/doorman for more information
 """
 
-from typing import Optional
 from pydantic import BaseModel, Field
 
 
@@ -66,6 +65,14 @@ class UpdateApiModel(BaseModel):
         description='Allow-list of gRPC methods as Service.Method strings. If set, only these methods are permitted.',
         example=['Greeter.SayHello'],
     )
+    api_grpc_channels: int | None = Field(
+        None,
+        ge=1,
+        description=(
+            'Pooled gRPC channels per upstream target. '
+            'Defaults to GRPC_CHANNELS_PER_TARGET.'
+        ),
+    )
     api_credits_enabled: bool | None = Field(
         None, description='Enable credit-based authentication for the API', example=True
     )
@@ -129,6 +136,55 @@ class UpdateApiModel(BaseModel):
         None,
         description='Response transformation config. Supports headers, body (JSONPath), status mapping.',
     )
+    api_stream_response: bool | None = Field(
+        None,
+        description=(
+            'If true, REST responses are streamed from the upstream without buffering. '
+            'Ignored when api_response_transform is set.'
+        ),
+    )
+
+    # Upstream connection pool (one pool per upstream origin)
+    api_max_connections: int | None = Field(
+        None,
+        ge=1,
+        description='Max connections to each upstream server. Defaults to HTTP_MAX_CONNECTIONS.',
+    )
+    api_max_keepalive: int | None = Field(
+        None,
+        ge=0,
+        description='Max idle keep-alive connections per upstream. Defaults to HTTP_MAX_KEEPALIVE.',
+    )
+    api_keepalive_expiry: float | None = Field(
+        None,
+        ge=0,
+        description=(
+            'Seconds an idle upstream connection is kept. Defaults to HTTP_KEEPALIVE_EXPIRY.'
+        ),
+    )
+    api_http2: bool | None = Field(
+        None, description='Use HTTP/2 to the upstream servers. Defaults to HTTP_ENABLE_HTTP2.'
+    )
+    api_connect_timeout: float | None = Field(
+        None,
+        gt=0,
+        description='Upstream connect timeout in seconds. Defaults to HTTP_CONNECT_TIMEOUT.',
+    )
+    api_read_timeout: float | None = Field(
+        None,
+        gt=0,
+        description='Upstream read timeout in seconds. Defaults to HTTP_READ_TIMEOUT.',
+    )
+    api_write_timeout: float | None = Field(
+        None,
+        gt=0,
+        description='Upstream write timeout in seconds. Defaults to HTTP_WRITE_TIMEOUT.',
+    )
+    api_pool_timeout: float | None = Field(
+        None,
+        gt=0,
+        description='Seconds to wait for a free upstream connection. Defaults to HTTP_TIMEOUT.',
+    )
 
     # OpenAPI Auto-Discovery
     api_openapi_url: str | None = Field(
@@ -187,9 +243,12 @@ class UpdateApiModel(BaseModel):
         description='Dynamic collection name for custom CRUD data',
         example='crud_data_my_collection',
     )
-    api_crud_schema: Optional[dict] = Field(
+    api_crud_schema: dict | None = Field(
         None,
-        description="Schema definition for CRUD validation. Dict of field_name -> rules.",
+        description=(
+            'Schema definition for CRUD validation. Dict of field_name -> rules. '
+            'Fields with "indexed": true are indexed for list filters.'
+        ),
     )
 
     class Config: